@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import signal
+
+
+class AsyncEngine:
+    '''
+        Opt-in asyncio rotation engine. Screen data is fetched as tasks on the
+        event loop, the next screen's alongside the current one's, and a fetch
+        which overruns fetch_timeout no longer holds up the display: the screen
+        is shown with its previous data instead. Fetches run on daemon threads,
+        so one that hangs cannot hold up the exit. Drawing, including the
+        pacing of scrolling text, and the blocking I2C writes run in the loop's
+        executor, while waiting for the next screen and shutting down are
+        handled by the loop.
+    '''
+    fetch_timeout = 5
+
+    logger = logging.getLogger('Config')
+
+    def __init__(self, config):
+        self.config = config
+        self.scheduler = config.get_scheduler()
+        # number of screens shown so far, used to tell prefetched data from stale data
+        self.showings = 0
+        self._fetches = {}
+
+    def run(self):
+        asyncio.run(self.main())
+
+    def stop(self):
+        ''' end the rotation, waking any screen waiting out its duration '''
+        graceful_exit = getattr(self.config, 'graceful_exit', None)
+        if graceful_exit:
+            graceful_exit.exit = True
+        self.config.shutdown.set()
+        self.stopped.set()
+
+    async def main(self):
+        loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+
+        try:
+            while not self.stopped.is_set() and self.config.allow_master_render:
+                name = self.scheduler.poll()
+                if name is None:
+                    await self.sleep(self.scheduler.time_until_due())
+                    continue
+
+                try:
+                    await self.show(name)
+                finally:
+                    self.scheduler.done(name)
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+
+        graceful_exit = getattr(self.config, 'graceful_exit', None)
+        if graceful_exit:
+            await asyncio.to_thread(graceful_exit.exit_gracefully)
+
+    async def sleep(self, seconds):
+        ''' sleep for seconds, or until the engine is stopped '''
+        try:
+            await asyncio.wait_for(self.stopped.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def show(self, name):
+        AsyncEngine.logger.info("'" + name + "' is being processed")
+        self.showings += 1
+        screen = self.config.get_screen(name)
+
+        # data fetched while the previous screen was up is fresh enough to show
+        fetch = self.fetch(screen, self.showings - 1)
+        # fetch the next screen's data concurrently with this one's
+        upcoming = self.scheduler.peek()
+        if upcoming and upcoming != name:
+            self.fetch(self.config.get_screen(upcoming), self.showings)
+
+        fetched = await self.wait_for_fetch(name, fetch)
+        if fetch.done():
+            del self._fetches[name]
+        if self.stopped.is_set():
+            return
+
+        if not fetched and screen.data is None:
+            AsyncEngine.logger.warning("'" + name + "' skipped, its data is not available yet")
+            return
+
+        try:
+            await asyncio.to_thread(screen.run, True)
+            self.config.reduce_screen_limit(name)
+        except Exception as e:
+            AsyncEngine.logger.critical("Screen '" + name + "' has an internal error: " + str(e))
+
+    def fetch(self, screen, since):
+        '''
+            :return: the task fetching screen's data. A running fetch is reused,
+            as is a finished one started during showing since or later; any
+            other is dropped and the data fetched again.
+        '''
+        entry = self._fetches.get(screen.name)
+        if entry:
+            task, started = entry
+            if not task.done() or started >= since:
+                return task
+            # retrieve the outcome, so a failed fetch nobody waited on is not reported
+            if not task.cancelled():
+                task.exception()
+
+        task = asyncio.create_task(screen.fetch())
+        self._fetches[screen.name] = (task, self.showings)
+        return task
+
+    async def wait_for_fetch(self, name, task):
+        ''' :return: True if the fetch completed within fetch_timeout, False if not or if the engine was stopped '''
+        # the fetch itself is not waited on, so one that times out carries on for the next showing
+        stopped = asyncio.create_task(self.stopped.wait())
+        try:
+            await asyncio.wait([task, stopped], timeout=AsyncEngine.fetch_timeout,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+
+        if not task.done():
+            if not self.stopped.is_set():
+                AsyncEngine.logger.warning("'" + name + "' data took longer than "
+                                           + str(AsyncEngine.fetch_timeout) + " seconds to fetch")
+            return False
+        if task.cancelled():
+            return False
+        if task.exception():
+            AsyncEngine.logger.warning("Could not fetch '" + name + "' data: " + str(task.exception()))
+            return False
+        return True
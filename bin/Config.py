@@ -1,7 +1,19 @@
 import logging
 import json
+import os
 import signal
-
+import stat
+import tempfile
+import threading
+import time
+
+from bin.AsyncEngine import AsyncEngine
+from bin.FrameScheduler import FrameScheduler
+from bin.MetricsSampler import MetricsSampler
+from bin.ScreenPrefetcher import ScreenPrefetcher
+from bin.ScreenRegistry import ScreenRegistry
+from bin.ScreenScheduler import ScreenScheduler
+from bin.SupervisorClient import SupervisorClient
 from bin.Screens import *
 from bin.Scroller import Scroller
 from bin.Utils import HassioUtils, Utils
@@ -19,26 +31,63 @@ class Config:
         'static'
     ]
     HASSIO_DEPENDENT_SCREENS = [
-        'Splash'
+        'splash'
+    ]
+    # seconds the Supervisor probe may take before Home Assistant is assumed absent
+    HASSIO_PROBE_TIMEOUT = 2
+    # seconds a detection result saved to disk is trusted for
+    HASSIO_CACHE_TTL = 300
+    # kept in a directory only this user can write to, so the file cannot be planted or redirected
+    HASSIO_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'rpi_i2c_oled-' + str(os.getuid()))
+    HASSIO_CACHE_FILE = 'hassio.json'
+    SAMPLED_SCREENS = {
+        'cpu': 5,
+        'memory': 10,
+        'storage': 60,
+        'network': 60,
+        'splash': 300
+    }
+    # screens which can update their values while shown
+    LIVE_SCREENS = [
+        'cpu',
+        'memory',
+        'storage'
     ]
     OPTION_KEYS = {
         'show': 'show_{}_screen',
         'limit': '{}_screen_limit',
         'duration': '{}_screen_duration',
+        'priority': '{}_screen_priority',
+        'min_interval': '{}_screen_min_interval',
+        'max_interval': '{}_screen_max_interval',
+        'sample_interval': '{}_sample_interval',
+        'refresh_interval': '{}_refresh_interval',
+        'background_sampling': 'background_sampling',
+        'prefetch': 'prefetch',
+        'async_engine': 'async_engine',
+        'fetch_timeout': 'fetch_timeout',
         'temp_unit': 'temperature_unit',
         'default_duration': 'default_duration',
         'i2c_bus': 'i2c_bus',
+        'i2c_chunk_size': 'i2c_chunk_size',
         'screenshot': 'screenshot',
         'graceful_exit_text': 'graceful_exit_text',
         'static_screen_text': 'static_screen_text',
         'static_screen_text_noscroll': 'static_screen_text_noscroll',
         'scroll_amplitude': 'scroll_amplitude',
+        'scroll_speed': 'scroll_speed',
+        'scroll_fps': 'scroll_fps',
         'datetime_format': 'datetime_format',
+        'identity_cache_ttl': 'identity_cache_ttl',
+        'identity_watch_interfaces': 'identity_watch_interfaces',
         'welcome_screen_text': 'welcome_screen_text',
         'rotate': 'rotate',
         'show_icons': 'show_icons',
         'show_hint': 'show_hint',
-        'compact': 'compact'
+        'compact': 'compact',
+        'hardware_scroll': 'hardware_scroll',
+        'double_buffer': 'double_buffer',
+        'async_flush': 'async_flush'
     }
 
     logger = logging.getLogger('Config')
@@ -49,6 +98,10 @@ class Config:
         self._process_default_options()
         self.enabled_screens = []
         self.screen_limits = {}
+        # called once the display has shown its first frame
+        self.on_first_frame = None
+        # set when the display is shutting down, waking anything waiting on it
+        self.shutdown = threading.Event()
 
     def _load_options(self, path):
         Config.logger.info('Loading config: ' + path)
@@ -65,6 +118,19 @@ class Config:
         if scroller_amplitude:
             Scroller.default_amplitude = scroller_amplitude
 
+        scroller_speed = self.get_option_value('scroll_speed')
+        if scroller_speed:
+            Scroller.default_speed = float(scroller_speed)
+
+        scroller_fps = self.get_option_value('scroll_fps')
+        if scroller_fps:
+            FrameScheduler.default_fps = float(scroller_fps)
+
+        fetch_timeout = self.get_option_value('fetch_timeout')
+        if fetch_timeout:
+            AsyncEngine.fetch_timeout = float(fetch_timeout)
+            ScreenPrefetcher.timeout = float(fetch_timeout)
+
     def allow_screen_render(self, screen):
         if self.allow_master_render:
             if screen in self.screen_limits:
@@ -90,26 +156,116 @@ class Config:
         if hasattr(Config, 'hassio_supported'):
             return Config.hassio_supported
 
-        try:
-            info = HassioUtils.hassos_get_info('host/info')
-            if info:
-                Config.hassio_supported = True
-                Config.logger.info('Home Assistant instance found')
-            else:
-                Config.hassio_supported = False
-                Config.logger.info('Home Assistant is not supported on this instance')
-        except:
-            Config.hassio_supported = False
+        Config.hassio_supported = Config._detect_hassio()
+        if Config.hassio_supported:
+            Config.logger.info('Home Assistant instance found')
+        else:
             Config.logger.info('Home Assistant is not supported on this instance')
 
         return Config.hassio_supported
 
+    @staticmethod
+    def _detect_hassio():
+        '''
+            Add-ons are always given a SUPERVISOR_TOKEN, so without one there is
+            nothing to probe. Otherwise reuse a recent result saved to disk, or ask
+            the Supervisor with a hard deadline. Only a definite answer is saved, a
+            response or a refused connection, so a Supervisor still starting up is
+            asked again on the next start.
+        '''
+        token = SupervisorClient.environment_token()
+        if not token:
+            return False
+
+        cache_dir = Config._private_cache_dir()
+        try:
+            if not cache_dir:
+                raise OSError('no private cache directory')
+            with open(os.path.join(cache_dir, Config.HASSIO_CACHE_FILE), 'r') as f:
+                cached = json.loads(f.read())
+            if time.time() - cached['checked'] < Config.HASSIO_CACHE_TTL:
+                Config.logger.info('Using saved Home Assistant detection result')
+                return bool(cached['supported'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        result = {}
+        def probe():
+            client = SupervisorClient(token=token, timeout=Config.HASSIO_PROBE_TIMEOUT)
+            try:
+                result['info'] = client.get('host/info')
+                result['answered'] = True
+            except ConnectionRefusedError as e:
+                result['answered'] = True
+                Config.logger.info('Supervisor probe failed: ' + str(e))
+            except OSError as e:
+                # timed out or could not resolve the Supervisor, which may still be starting
+                Config.logger.info('Supervisor probe failed: ' + str(e))
+            except Exception as e:
+                # the Supervisor responded, but not with the host info
+                result['answered'] = True
+                Config.logger.info('Supervisor probe failed: ' + str(e))
+            finally:
+                client.close()
+
+        # name resolution ignores socket timeouts, so bound the whole probe
+        thread = threading.Thread(target=probe, name='HassioProbe', daemon=True)
+        thread.start()
+        thread.join(Config.HASSIO_PROBE_TIMEOUT)
+        supported = bool(result.get('info'))
+
+        if cache_dir and result.get('answered'):
+            Config._save_cache(cache_dir, Config.HASSIO_CACHE_FILE,
+                               json.dumps({'supported': supported, 'checked': time.time()}))
+
+        return supported
+
+    @staticmethod
+    def _private_cache_dir():
+        ''' :return: the cache directory, created for this user only, or None when it cannot be trusted '''
+        try:
+            try:
+                os.mkdir(Config.HASSIO_CACHE_DIR, 0o700)
+            except FileExistsError:
+                pass
+            info = os.lstat(Config.HASSIO_CACHE_DIR)
+        except OSError as e:
+            Config.logger.info('Could not create cache directory: ' + str(e))
+            return None
+
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            Config.logger.warning("Ignoring cache directory '" + Config.HASSIO_CACHE_DIR
+                                  + "', it is not a private directory owned by this user")
+            return None
+        return Config.HASSIO_CACHE_DIR
+
+    @staticmethod
+    def _save_cache(cache_dir, name, content):
+        ''' write content to a temporary file and move it into place, so readers never see half a file '''
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, os.path.join(cache_dir, name))
+        except OSError as e:
+            Config.logger.info('Could not save ' + name + ': ' + str(e))
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
     def _init_display(self):
         try:
             busnum = None
             if self.has_option('i2c_bus'):
                 busnum = int(self.get_option_value('i2c_bus'))
 
+            chunk_size = None
+            if self.get_option_value('i2c_chunk_size') is not None:
+                chunk_size = int(self.get_option_value('i2c_chunk_size'))
+
             screenshot = self.get_option_value('screenshot')
             if not screenshot:
                 screenshot = False
@@ -118,10 +274,18 @@ class Config:
             show_icons = self.get_option_value('show_icons')
             show_hint = self.get_option_value('show_hint')
             compact = self.get_option_value('compact')
+            hardware_scroll = self.get_option_value('hardware_scroll')
+            double_buffer = self.get_option_value('double_buffer')
+            async_flush = self.get_option_value('async_flush')
 
             self.display = Display(busnum=busnum, screenshot=screenshot,
                                    rotate=rotate, show_icons=show_icons,
-                                   show_hint=show_hint, compact=compact)
+                                   show_hint=show_hint, compact=compact,
+                                   chunk_size=chunk_size,
+                                   hardware_scroll=hardware_scroll,
+                                   double_buffer=double_buffer,
+                                   async_flush=async_flush)
+            self.display.on_first_frame = self.on_first_frame
 
         except Exception as e:
             raise Exception("Could not create display. Check your i2c bus with 'ls /dev/i2c-*'.")
@@ -136,6 +300,30 @@ class Config:
         if datetime_format:
             self.utils.datetime_format = datetime_format
 
+        if self.get_option_value('identity_cache_ttl') is not None:
+            Utils.identity_ttl = float(self.get_option_value('identity_cache_ttl'))
+
+        if self.get_option_value('identity_watch_interfaces') is not None:
+            Utils.identity_watch_interfaces = bool(self.get_option_value('identity_watch_interfaces'))
+
+    def _init_sampler(self):
+        '''
+            Start sampling the data of enabled screens in the background when
+            'background_sampling' is set, otherwise screens collect it on render
+        '''
+        self.sampler = None
+        if not self.get_option_value('background_sampling'):
+            return
+
+        self.sampler = MetricsSampler()
+        for name, interval in Config.SAMPLED_SCREENS.items():
+            if name in self.enabled_screens:
+                if self.get_option_value('sample_interval', name):
+                    interval = float(self.get_option_value('sample_interval', name))
+                screen = self._create_screen(name)
+                self.sampler.add_source(name, screen.collect, interval)
+        self.sampler.start()
+
     def enable_screen(self, name):
         if name in Config.SUPPORTED_SCREENS and name not in self.enabled_screens:
             if name not in Config.HASSIO_DEPENDENT_SCREENS or self.is_hassio_supported:
@@ -158,6 +346,10 @@ class Config:
             if not self.screen_limits[screen]:
                 Config.logger.info("'" + screen + "' iteration limit reached")
                 self.remove_enabled_screen(screen)
+                if hasattr(self, 'screens'):
+                    self.screens.remove(screen)
+                if hasattr(self, 'scheduler'):
+                    self.scheduler.remove(screen)
 
     def get_enabled_screens(self):
         '''
@@ -219,6 +411,53 @@ class Config:
         if not hasattr(self, 'utils'):
             self._init_utils()
 
+        if not hasattr(self, 'sampler'):
+            self._init_sampler()
+
+        return self._create_screen(name)
+
+    def get_screen(self, name):
+        '''
+            The screen called name, created once and kept across rotations.
+            Use screen_factory for a screen separate from the rotation.
+        '''
+        if not hasattr(self, 'screens'):
+            self.screens = ScreenRegistry(self.screen_factory)
+
+        return self.screens.get(name)
+
+    def get_scheduler(self):
+        ''' The scheduler deciding which enabled screen is shown next '''
+        if not hasattr(self, 'scheduler'):
+            self._init_scheduler()
+
+        return self.scheduler
+
+    def get_prefetcher(self):
+        '''
+            The prefetcher refreshing the next screen's data while the current
+            one is shown, or None unless the 'prefetch' option is set
+        '''
+        if not hasattr(self, 'prefetcher'):
+            self.prefetcher = None
+            if self.get_option_value('prefetch'):
+                self.prefetcher = ScreenPrefetcher(self.get_screen)
+                Config.logger.info('Screen prefetching enabled')
+
+        return self.prefetcher
+
+    def _init_scheduler(self):
+        self.scheduler = ScreenScheduler(self.shutdown)
+        for name in self.enabled_screens:
+            priority = self.get_option_value('priority', name)
+            min_interval = self.get_option_value('min_interval', name)
+            max_interval = self.get_option_value('max_interval', name)
+            self.scheduler.add(name,
+                               priority=priority if priority else 0,
+                               min_interval=min_interval if min_interval else 0,
+                               max_interval=max_interval)
+
+    def _create_screen(self, name):
         if name == 'static':
             duration = self.get_screen_duration(name)
             screen = StaticScreen(duration, self.display, self.utils, self)
@@ -236,6 +475,9 @@ class Config:
             if name == 'cpu':
                 screen.set_temp_unit(self.get_option_value('temp_unit'))
 
+            if name in Config.LIVE_SCREENS and self.get_option_value('refresh_interval', name):
+                screen.refresh_interval = float(self.get_option_value('refresh_interval', name))
+
             if name == 'welcome':
                 screen.text = self.get_option_value('welcome_screen_text')
                 screen.amplitude = self.get_option_value('scroll_amplitude')
@@ -253,19 +495,32 @@ class Config:
         screen.duration = 0
         screen.noscroll = True
 
-        self.graceful_exit = GracefulExit(screen)
+        self.graceful_exit = GracefulExit(screen, self.shutdown, self.stop_background_work)
         Config.logger.info('Graceful exit enabled')
 
+    def stop_background_work(self):
+        ''' let go of data still being fetched, so a source which hangs cannot hold up the exit '''
+        prefetcher = getattr(self, 'prefetcher', None)
+        if prefetcher:
+            prefetcher.close()
+
 class GracefulExit:
     exit = False
     exiting = False
-    def __init__(self, screen):
+    def __init__(self, screen, shutdown = None, on_exit = None):
         self.screen = screen
+        self.shutdown = shutdown
+        # called as soon as the exit is requested, before the exit screen is shown
+        self.on_exit = on_exit
         signal.signal(signal.SIGINT, self.exit_gracefully)
         signal.signal(signal.SIGTERM, self.exit_gracefully)
 
     def exit_gracefully(self, *args):
         self.exit = True
+        if self.shutdown:
+            self.shutdown.set()
+        if self.on_exit:
+            self.on_exit()
         if not self.exiting:
             self.exiting = True
             Config.logger.info('Exiting')
@@ -273,3 +528,4 @@ class GracefulExit:
             # self.screen.display.prepare()
             # self.screen.display.show()
             self.screen.run()
+            self.screen.display.flush()
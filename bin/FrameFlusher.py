@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+
+class FrameFlusher:
+    '''
+        Sends frames to the SSD1306 driver from a background thread so the next
+        frame can be drawn while the previous one is still on the I2C bus.
+        Only the latest submitted frame is kept; a frame replaced before the
+        thread picks it up is dropped rather than queued.
+    '''
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = logging.getLogger('Display')
+        self._condition = threading.Condition()
+        self.reset()
+        self._pending = None
+        self._regions = None
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='FrameFlusher', daemon=True)
+        self._thread.start()
+
+    def reset(self):
+        ''' count frames afresh, so the figures cover a single screen '''
+        with self._condition:
+            self.frames = 0
+            self.dropped = 0
+            # when the first counted frame was submitted and the last one sent
+            self.first_submitted = None
+            self.last_sent = None
+
+    @property
+    def fps(self):
+        ''' frames sent per second while frames were being drawn, idle time excluded '''
+        if self.first_submitted is None or self.last_sent is None:
+            return 0.0
+        elapsed = self.last_sent - self.first_submitted
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def submit(self, image, regions = None):
+        '''
+            hand over a 1 bit image for display, replacing any frame not yet sent.
+            regions lists the rectangles changed since the previous frame, or None
+            if the whole frame may have changed.
+        '''
+        with self._condition:
+            if self.first_submitted is None:
+                self.first_submitted = time.monotonic()
+            if self._pending is not None:
+                self.dropped += 1
+                # the replaced frame's changes have not been sent either
+                if regions is not None and self._regions is not None:
+                    regions = self._regions + list(regions)
+                else:
+                    regions = None
+            self._pending = image
+            self._regions = regions
+            self._condition.notify_all()
+
+    def flush(self):
+        ''' wait until every submitted frame has reached the display '''
+        with self._condition:
+            while self._pending is not None or self._busy:
+                self._condition.wait()
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def report(self):
+        if self.frames < 2:
+            return f"{self.frames} frames sent, {self.dropped} dropped"
+        return f"{self.frames} frames sent at {self.fps:.1f} fps, {self.dropped} dropped"
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                image = self._pending
+                regions = self._regions
+                self._pending = None
+                self._regions = None
+                self._busy = True
+
+            sent = False
+            try:
+                self.driver.image(image, regions)
+                self.driver.display()
+                sent = True
+            except Exception as e:
+                self.logger.error("Frame could not be sent to the display: " + str(e))
+
+            with self._condition:
+                self._busy = False
+                if sent:
+                    self.frames += 1
+                    self.last_sent = time.monotonic()
+                self._condition.notify_all()
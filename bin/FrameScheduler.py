@@ -0,0 +1,33 @@
+import time
+
+
+class FrameScheduler:
+    '''
+        Paces an animation loop to a target frame rate using monotonic
+        deadlines. When a frame overruns, the missed slots are skipped
+        instead of being rendered late.
+    '''
+    default_fps = 30
+
+    def __init__(self, fps = None):
+        fps = fps if fps else FrameScheduler.default_fps
+        self.interval = 1.0 / float(fps)
+        self.skipped = 0
+        self.last = time.monotonic()
+        self.deadline = self.last + self.interval
+
+    def wait(self):
+        ''' sleep until the next frame is due, returning the seconds since the previous one '''
+        now = time.monotonic()
+        if now < self.deadline:
+            time.sleep(self.deadline - now)
+            now = time.monotonic()
+            self.deadline += self.interval
+        else:
+            missed = int((now - self.deadline) / self.interval)
+            self.skipped += missed
+            self.deadline += (missed + 1) * self.interval
+
+        elapsed = now - self.last
+        self.last = now
+        return elapsed
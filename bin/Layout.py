@@ -0,0 +1,158 @@
+from bin.Utils import Utils
+
+
+class Region:
+    '''
+        A named area of the canvas showing a single value. It is redrawn only
+        when its value changes. draw(display, value) paints the value and
+        bbox(display, value) returns the (x0, y0, x1, y1) rectangle it covers.
+    '''
+    def __init__(self, name, draw = None, bbox = None):
+        self.name = name
+        self.value = None
+        # rectangle covered by what is on the canvas, None when nothing is
+        self.shown = None
+        self.dirty = True
+        if draw:
+            self.draw = draw
+        if bbox:
+            self.bbox = bbox
+
+    def update(self, value):
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def draw(self, display, value):
+        raise NotImplementedError
+
+    def bbox(self, display, value):
+        raise NotImplementedError
+
+
+class TextRegion(Region):
+    def __init__(self, name, xy, font, fill = 255):
+        super().__init__(name)
+        self.xy = xy
+        self.font = font
+        self.fill = fill
+
+    def draw(self, display, value):
+        display.draw.text(self.xy, value, font=self.font, fill=self.fill)
+
+    def bbox(self, display, value):
+        if not value:
+            return None
+        # measured on the canvas, as font.getbbox() misses ink drawn in mode '1'
+        x, y = self.xy
+        left, top, right, bottom = Utils.text_metrics.textbbox(display, value, self.font)
+        return (x + left, y + top, x + right, y + bottom)
+
+
+class ImageRegion(Region):
+    def __init__(self, name, xy):
+        super().__init__(name)
+        self.xy = xy
+
+    def update(self, value):
+        # images are cached, so a new object means a new image
+        if value is not self.value:
+            self.value = value
+            self.dirty = True
+
+    def draw(self, display, value):
+        display.image.paste(value, self.xy)
+
+    def bbox(self, display, value):
+        x, y = self.xy
+        return (x, y, x + value.width, y + value.height)
+
+
+class Layout:
+    '''
+        Named regions of the canvas which redraw independently. render() only
+        clears and redraws the regions whose values changed, plus any region
+        overlapping the cleared area, and returns the changed rectangles so
+        only those reach the display.
+    '''
+    def __init__(self, display):
+        self.display = display
+        self.regions = {}
+        self.full = True
+
+    def __getitem__(self, name):
+        return self.regions[name]
+
+    def __contains__(self, name):
+        return name in self.regions
+
+    def add(self, region):
+        self.regions[region.name] = region
+        self.full = True
+        return region
+
+    def update(self, name, value):
+        self.regions[name].update(value)
+
+    def invalidate(self):
+        ''' redraw the whole canvas on the next render '''
+        self.full = True
+
+    def render(self):
+        ''' redraw the changed regions, :return: the (x0, y0, x1, y1) rectangles of the canvas that changed '''
+        if self.full:
+            self.full = False
+            self.display.prepare()
+            for region in self.regions.values():
+                self._draw(region)
+            return [(0, 0, self.display.width, self.display.height)]
+
+        rects = []
+        for region in self.regions.values():
+            if region.dirty:
+                rects.append(region.shown)
+                rects.append(self._bbox(region))
+        rects = [rect for rect in rects if rect]
+
+        # clearing a rectangle erases any region overlapping it, so redraw those as well
+        found = True
+        while found:
+            found = False
+            for region in self.regions.values():
+                if (not region.dirty and region.shown
+                        and any(Layout.overlaps(region.shown, rect) for rect in rects)):
+                    region.dirty = True
+                    rects.append(region.shown)
+                    found = True
+
+        for x0, y0, x1, y1 in rects:
+            self.display.draw.rectangle((x0, y0, x1 - 1, y1 - 1), outline=0, fill=0)
+        for region in self.regions.values():
+            if region.dirty:
+                self._draw(region)
+        return rects
+
+    def _draw(self, region):
+        if region.value is not None:
+            region.draw(self.display, region.value)
+        region.shown = self._bbox(region)
+        region.dirty = False
+
+    def _bbox(self, region):
+        ''' the region's rectangle clipped to the canvas '''
+        if region.value is None:
+            return None
+        bbox = region.bbox(self.display, region.value)
+        if not bbox:
+            return None
+        x0 = max(0, int(bbox[0]))
+        y0 = max(0, int(bbox[1]))
+        x1 = min(self.display.width, int(bbox[2]))
+        y1 = min(self.display.height, int(bbox[3]))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (x0, y0, x1, y1)
+
+    @staticmethod
+    def overlaps(a, b):
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
@@ -0,0 +1,90 @@
+import logging
+import os
+from collections import namedtuple
+
+CpuInfo = namedtuple('CpuInfo', ['load', 'uptime', 'temperature'])
+NetworkInfo = namedtuple('NetworkInfo', ['hostname', 'ip'])
+HassioInfo = namedtuple('HassioInfo', ['hostname', 'os', 'core'])
+
+
+class Metrics:
+    '''
+        Reads system metrics straight from /proc, /sys and statvfs rather
+        than forking shell pipelines for them.
+    '''
+    logger = logging.getLogger('Utils')
+    thermal_zone = '/sys/class/thermal/thermal_zone0/temp'
+
+    @staticmethod
+    def read_file(path):
+        with open(path, 'r') as f:
+            return f.read()
+
+    @staticmethod
+    def get_load_average():
+        ''' :return: the 1, 5 and 15 minute load averages '''
+        fields = Metrics.read_file('/proc/loadavg').split()
+        return (float(fields[0]), float(fields[1]), float(fields[2]))
+
+    @staticmethod
+    def get_uptime():
+        ''' :return: seconds since boot '''
+        return float(Metrics.read_file('/proc/uptime').split()[0])
+
+    @staticmethod
+    def format_uptime(seconds):
+        ''' :return: the largest unit of the uptime, e.g. '3 days', '2:05' or '7 min' '''
+        minutes = int(seconds // 60)
+        days, minutes = divmod(minutes, 24 * 60)
+        hours, minutes = divmod(minutes, 60)
+        if days:
+            return f"{days} day" if days == 1 else f"{days} days"
+        if hours:
+            return f"{hours}:{minutes:02d}"
+        return f"{minutes} min"
+
+    @staticmethod
+    def get_temperature():
+        ''' :return: CPU temperature in degrees Celsius '''
+        return float(Metrics.read_file(Metrics.thermal_zone)) / 1000.00
+
+    @staticmethod
+    def get_memory():
+        ''' :return: used and total memory in MiB, as reported by free -m '''
+        info = {}
+        for line in Metrics.read_file('/proc/meminfo').splitlines():
+            key, value = line.split(':', 1)
+            info[key] = int(value.split()[0])
+
+        total = info['MemTotal']
+        if 'MemAvailable' in info:
+            used = total - info['MemAvailable']
+        else:
+            used = total - info['MemFree'] - info.get('Buffers', 0) - info.get('Cached', 0)
+        return (used // 1024, total // 1024)
+
+    @staticmethod
+    def get_storage(path = '/'):
+        ''' :return: used and total KiB and the utilised percentage, as reported by df '''
+        stat = os.statvfs(path)
+        total = stat.f_blocks * stat.f_frsize // 1024
+        used = (stat.f_blocks - stat.f_bfree) * stat.f_frsize // 1024
+        available = stat.f_bavail * stat.f_frsize // 1024
+        # df rounds the percentage up
+        usable = used + available
+        percent = -(-used * 100 // usable) if usable else 0
+        return (used, total, f"{percent}%")
+
+    @staticmethod
+    def get_cpu():
+        return CpuInfo(Metrics.get_load_average(), Metrics.get_uptime(), Metrics.get_temperature())
+
+    @staticmethod
+    def get_network(utils):
+        return NetworkInfo(utils.get_hostname(), utils.get_ip())
+
+    @staticmethod
+    def get_hassio(utils):
+        # warm the host/info cache the hostname is read from alongside the rest
+        infos = utils.hassos_get_infos(['host/info', 'os/info', 'core/info'])
+        return HassioInfo(utils.get_hostname(), infos['os/info'], infos['core/info'])
@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+
+class MetricsSampler:
+    '''
+        Collects screen data on a background thread. Each source is refreshed
+        on its own interval and published in an immutable snapshot, so screens
+        can read the latest values without waiting on slow commands or APIs.
+    '''
+    logger = logging.getLogger('Utils')
+
+    def __init__(self):
+        self._sources = {}
+        self._snapshot = MappingProxyType({})
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_source(self, name, collect, interval):
+        ''' register a callable whose result is published as snapshot[name] every interval seconds '''
+        self._sources[name] = (collect, float(interval))
+        MetricsSampler.logger.info("'" + name + "' sampled every " + str(interval) + " seconds")
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def get(self, name, default = None):
+        return self._snapshot.get(name, default)
+
+    def start(self):
+        if self._thread is None and self._sources:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='MetricsSampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self, name):
+        ''' refresh a single source now; the previous value is kept if it fails '''
+        collect, interval = self._sources[name]
+        try:
+            value = collect()
+        except Exception as e:
+            MetricsSampler.logger.warning("Could not sample '" + name + "': " + str(e))
+            return
+        # publish a new snapshot rather than mutating the one readers hold
+        self._snapshot = MappingProxyType({**self._snapshot, name: value})
+
+    def _run(self):
+        due = {name: 0.0 for name in self._sources}
+        while not self._stop.is_set():
+            for name in self._sources:
+                if due[name] <= time.monotonic():
+                    self.sample(name)
+                    due[name] = time.monotonic() + self._sources[name][1]
+
+            self._stop.wait(max(0.0, min(due.values()) - time.monotonic()))
@@ -23,7 +23,12 @@ from __future__ import division
 import logging
 
 # import SSD1306.I2C as I2C
-import smbus
+from bin import smbus
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Constants
 SSD1306_I2C_ADDRESS = 0x3C    # 011110+SA0+RW - 0x3C or 0x3D
@@ -62,18 +67,66 @@ SSD1306_LEFT_HORIZONTAL_SCROLL = 0x27
 SSD1306_VERTICAL_AND_RIGHT_HORIZONTAL_SCROLL = 0x29
 SSD1306_VERTICAL_AND_LEFT_HORIZONTAL_SCROLL = 0x2A
 
+# Horizontal scroll step intervals, in frames
+SSD1306_SCROLL_2_FRAMES = 0x07
+SSD1306_SCROLL_3_FRAMES = 0x04
+SSD1306_SCROLL_4_FRAMES = 0x05
+SSD1306_SCROLL_5_FRAMES = 0x00
+SSD1306_SCROLL_25_FRAMES = 0x06
+
+# Neighbouring dirty pages are flushed as one window when doing so sends at
+# most this many unchanged bytes, which is cheaper than re-addressing.
+SSD1306_WINDOW_MERGE_SLACK = 16
+
+# Rows of GDDRAM on the controller, whatever the panel height.
+SSD1306_GDDRAM_HEIGHT = 64
+
+# Data bytes per I2C write.  0 sends each window in a single transaction.
+SSD1306_DEFAULT_CHUNK_SIZE = 16
+
+# Lookup tables used to transpose an 8x8 block of packed image rows into 8
+# page-ordered column bytes.  _ROW_TO_COLUMNS[row][byte] holds the 8 column
+# bytes (little endian packed into an int) that the row contributes.
+_ROW_TO_COLUMNS = [
+    [sum(1 << (row + 8*col) for col in range(8) if byte & (0x80 >> col))
+     for byte in range(256)]
+    for row in range(8)
+]
+
 
 class SSD1306Base(object):
     """Base class for SSD1306-based OLED displays.  Implementors should subclass
     and provide an implementation for the _initialize function.
     """
 
-    def __init__(self, width, height, i2c_address=SSD1306_I2C_ADDRESS, busnum=1):
+    def __init__(self, width, height, i2c_address=SSD1306_I2C_ADDRESS, busnum=1,
+                 chunk_size=SSD1306_DEFAULT_CHUNK_SIZE, double_buffer=False):
         self._log = logging.getLogger('Adafruit_SSD1306.SSD1306Base')
         self.width = width
         self.height = height
+        self.chunk_size = chunk_size
         self._pages = height//8
-        self._buffer = [0]*(width*self._pages)
+        self._buffer = bytearray(width*self._pages)
+        self._view = memoryview(self._buffer)
+        self._blank = bytes(len(self._buffer))
+        # Staging area for windows that are not contiguous in the buffer.
+        self._scratch = memoryview(bytearray(len(self._buffer)))
+        self._window_commands = bytearray(6)
+        # GDDRAM is split into halves of panel height when double buffering.
+        if double_buffer and height*2 > SSD1306_GDDRAM_HEIGHT:
+            self._log.error('No spare GDDRAM for a %d row panel; double buffering disabled', height)
+            double_buffer = False
+        self._halves = 2 if double_buffer else 1
+        # Half of GDDRAM currently visible.
+        self._front = 0
+        # Copy of what each GDDRAM half holds, only trusted when marked valid.
+        self._shadows = [bytearray(len(self._buffer)) for _ in range(self._halves)]
+        self._shadow_valid = [False]*self._halves
+        # Whether the buffer holds a whole converted image, so regions can be updated alone.
+        self._buffer_is_image = False
+        # Pages image() changed since the last display(); None or empty when unknown.
+        self._touched = None
+        self._scrolling = False
         self._address = i2c_address
 
         # Handle hardware I2C
@@ -92,38 +145,180 @@ class SSD1306Base(object):
         self._log.debug("Wrote 0x%02X to register 0x%02X", value, control)
 
     def send_commands(self, commands):
-        """Send multiple command bytes to display."""
+        """Send multiple command bytes to display in a single transaction."""
         if commands:
-            for c in commands:
-                self.command(c)
+            control = 0x00   # Co = 0, DC = 0
+            if not isinstance(commands, (bytes, bytearray)):
+                commands = bytes(c & 0xFF for c in commands)
+            self._bus.write_i2c_block_buffer(self._address, control, commands)
+            self._log.debug("Wrote to register 0x%02X: %s", control, commands)
 
     def begin(self, vccstate=SSD1306_SWITCHCAPVCC):
         """Initialize display."""
         # Save vcc state.
         self._vccstate = vccstate
+        # GDDRAM content is undefined until the next full write.
+        self.invalidate()
         # initialize display.
         self._initialize()
+        self._front = 0
         # Turn on the display.
         self.command(SSD1306_DISPLAYON)
 
+    def invalidate(self):
+        """Forget what the panel holds so the next display() writes everything."""
+        self._shadow_valid = [False]*self._halves
+
+    def start_scroll(self, left=True, interval=SSD1306_SCROLL_2_FRAMES):
+        """Let the display continuously scroll its current content horizontally.
+        GDDRAM rows wrap around, so content is never lost while scrolling.
+        """
+        self.send_commands([
+            SSD1306_DEACTIVATE_SCROLL,
+            SSD1306_LEFT_HORIZONTAL_SCROLL if left else SSD1306_RIGHT_HORIZONTAL_SCROLL,
+            0x00,                       # Dummy byte.
+            self._front*self._pages,    # Start page.
+            interval,                   # Frames between scroll steps.
+            (self._front+1)*self._pages-1,  # End page.
+            0x00,                       # Dummy byte.
+            0xFF,                       # Dummy byte.
+            SSD1306_ACTIVATE_SCROLL
+        ])
+        self._scrolling = True
+
+    def stop_scroll(self):
+        """Stop a hardware scroll.  The scrolled GDDRAM no longer matches the
+        buffer, so the next display() rewrites everything.
+        """
+        self.command(SSD1306_DEACTIVATE_SCROLL)
+        self._scrolling = False
+        self.invalidate()
+
+    @property
+    def double_buffered(self):
+        return self._halves > 1
+
     def display(self):
-        """Write display buffer to physical display."""
-        self.command(SSD1306_COLUMNADDR)
-        self.command(0)              # Column start address. (0 = reset)
-        self.command(self.width-1)   # Column end address.
-        self.command(SSD1306_PAGEADDR)
-        self.command(0)              # Page start address. (0 = reset)
-        self.command(self._pages-1)  # Page end address.
+        """Write the parts of the display buffer that changed since the last
+        call to the physical display.  Nothing is sent if nothing changed.
+
+        When double buffered the frame goes to the hidden GDDRAM half, which
+        is then shown with a single start line command, so a partially
+        written frame is never visible.
+
+        When the changes came from image() regions only those pages are compared.
+        """
+        # Writing GDDRAM while the scroll engine is active corrupts it.
+        if self._scrolling:
+            self.stop_scroll()
+        touched, self._touched = self._touched, set()
+        if self._shadow_valid[self._front] and self._shadows[self._front] == self._buffer:
+            return
+
+        skipped = self._bus.select_skipped
+        target = (self._front + 1) % self._halves
+        shadow = self._shadows[target] if self._shadow_valid[target] else None
+        # The hidden half is two frames old, so single buffering alone can trust regions.
+        pages = sorted(touched) if touched and self._halves == 1 else None
+        for window in self._dirty_windows(shadow, pages):
+            self._write_window(*window, page_offset=target*self._pages)
+        self._shadows[target][:] = self._buffer
+        self._shadow_valid[target] = True
+
+        if target != self._front:
+            self.command(SSD1306_SETSTARTLINE | (target*self.height))
+            self._front = target
+        self._log.debug("Frame flushed, %d slave select syscalls saved",
+                        self._bus.select_skipped - skipped)
+
+    def _region_pages(self, regions):
+        """Return the sorted pages covered by (x0, y0, x1, y1) pixel rectangles,
+        or None when regions is None.
+        """
+        if regions is None:
+            return None
+        pages = set()
+        for x0, y0, x1, y1 in regions:
+            first = max(0, int(y0)//8)
+            last = min(self._pages-1, (int(y1)-1)//8)
+            pages.update(range(first, last+1))
+        return sorted(pages)
+
+    def _dirty_windows(self, shadow, pages=None):
+        """Return (page_start, page_end, column_start, column_end) windows that
+        cover every byte differing from the shadow copy, looking only at pages
+        when given.
+        """
+        if shadow is None:
+            return [(0, self._pages-1, 0, self.width-1)]
+
+        buffer = self._view
+        shadow = memoryview(shadow)
+        windows = []
+        for page in (range(self._pages) if pages is None else pages):
+            start = page*self.width
+            end = start + self.width
+            if buffer[start:end] == shadow[start:end]:
+                continue
+            first = 0
+            while buffer[start+first] == shadow[start+first]:
+                first += 1
+            last = self.width-1
+            while buffer[start+last] == shadow[start+last]:
+                last -= 1
+
+            if windows and windows[-1][1] == page-1:
+                page_start, unused, col_start, col_end = windows[-1]
+                merged_start = min(col_start, first)
+                merged_end = max(col_end, last)
+                merged = (merged_end - merged_start + 1)*(page - page_start + 1)
+                separate = (col_end - col_start + 1)*(page - page_start) + last - first + 1
+                if merged - separate <= SSD1306_WINDOW_MERGE_SLACK:
+                    windows[-1] = (page_start, page, merged_start, merged_end)
+                    continue
+            windows.append((page, page, first, last))
+        return windows
+
+    def _write_window(self, page_start, page_end, col_start, col_end, page_offset=0):
+        """Write a rectangular page/column window of the buffer to the display,
+        page_offset pages further down GDDRAM.
+        """
+        commands = self._window_commands
+        commands[0] = SSD1306_COLUMNADDR
+        commands[1] = col_start                 # Column start address.
+        commands[2] = col_end                   # Column end address.
+        commands[3] = SSD1306_PAGEADDR
+        commands[4] = page_offset+page_start    # Page start address.
+        commands[5] = page_offset+page_end      # Page end address.
+        self.send_commands(commands)
+        # Full width windows are contiguous in the buffer, anything narrower is
+        # gathered in the order the display auto-increments.
+        if page_start == page_end or (col_start == 0 and col_end == self.width-1):
+            data = self._view[page_start*self.width+col_start:page_end*self.width+col_end+1]
+        else:
+            columns = col_end - col_start + 1
+            index = 0
+            for page in range(page_start, page_end+1):
+                offset = page*self.width + col_start
+                self._scratch[index:index+columns] = self._view[offset:offset+columns]
+                index += columns
+            data = self._scratch[:index]
         # Write buffer data.
-        for i in range(0, len(self._buffer), 16):
-            control = 0x40   # Co = 0, DC = 0
-            data = self._buffer[i:i+16]
-            self._bus.write_i2c_block_data(self._address, control, data)
-            self._log.debug("Wrote to register 0x%02X: %s", control, data)
+        step = self.chunk_size if self.chunk_size > 0 else len(data)
+        for i in range(0, len(data), step):
+            control = 0x40   # Co = 0, DC = 1
+            chunk = data[i:i+step]
+            self._bus.write_i2c_block_buffer(self._address, control, chunk)
+            if self._log.isEnabledFor(logging.DEBUG):
+                self._log.debug("Wrote to register 0x%02X: %s", control, chunk.hex())
 
-    def image(self, image):
+    def image(self, image, regions=None):
         """Set buffer to value of Python Imaging Library image.  The image should
         be in 1 bit mode and a size equal to the display size.
+
+        regions optionally lists the (x0, y0, x1, y1) pixel rectangles that
+        changed since the previous image, so only the pages they cover are
+        converted.
         """
         if image.mode != '1':
             raise ValueError('Image must be in mode 1.')
@@ -131,61 +326,89 @@ class SSD1306Base(object):
         if imwidth != self.width or imheight != self.height:
             raise ValueError('Image must be same dimensions as display ({0}x{1}).' \
                 .format(self.width, self.height))
-        # Grab all the pixels from the image, faster than getpixel.
-        pix = image.load()
-        # Iterate through the memory pages
-        index = 0
-        for page in range(self._pages):
-            # Iterate through all x axis columns.
-            for x in range(self.width):
-                # Set the bits for the column of pixels at the current position.
-                bits = 0
-                # Don't use range here as it's a bit slow
-                for bit in [0, 1, 2, 3, 4, 5, 6, 7]:
-                    bits = bits << 1
-                    bits |= 0 if pix[(x, page*8+7-bit)] == 0 else 1
-                # Update buffer byte and increment to next byte.
-                self._buffer[index] = bits
-                index += 1
+        first, last = 0, self._pages-1
+        pages = self._region_pages(regions)
+        if pages is not None and self._buffer_is_image:
+            if not pages:
+                return
+            first, last = pages[0], pages[-1]
+        if self._touched is not None:
+            self._touched.update(range(first, last+1))
+        if numpy is not None:
+            self._image_numpy(image, first, last)
+        else:
+            self._image_lut(image, first, last)
+        self._buffer_is_image = True
+
+    def _image_numpy(self, image, first, last):
+        """Pack pages first to last of the image into page ordered bytes with
+        numpy bit operations.
+        """
+        stride = self.width // 8
+        data = image.tobytes()[first*8*stride:(last+1)*8*stride]
+        bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8))
+        bits = bits.reshape(last-first+1, 8, self.width).transpose(0, 2, 1)
+        self._view[first*self.width:(last+1)*self.width] = \
+            numpy.packbits(bits, axis=2, bitorder='little').ravel()
+
+    def _image_lut(self, image, first, last):
+        """Pack pages first to last of the image into page ordered bytes using
+        the transpose tables.
+        """
+        data = image.tobytes()
+        stride = self.width // 8
+        t0, t1, t2, t3, t4, t5, t6, t7 = _ROW_TO_COLUMNS
+        index = first*self.width
+        for page in range(first, last+1):
+            rows = [data[(page*8 + row)*stride:(page*8 + row + 1)*stride] for row in range(8)]
+            # Each packed byte of a row covers 8 columns, so transpose 8x8 blocks.
+            for r0, r1, r2, r3, r4, r5, r6, r7 in zip(*rows):
+                block = t0[r0] | t1[r1] | t2[r2] | t3[r3] | t4[r4] | t5[r5] | t6[r6] | t7[r7]
+                self._buffer[index:index+8] = block.to_bytes(8, 'little')
+                index += 8
 
     def clear(self):
         """Clear contents of image buffer."""
-        self._buffer = [0]*(self.width*self._pages)
+        self._buffer[:] = self._blank
+        self._buffer_is_image = False
+        self._touched = None
 
 class SSD1306_128_32(SSD1306Base):
-    def __init__(self, busnum=1, i2c_address=SSD1306_I2C_ADDRESS):
+    def __init__(self, busnum=1, i2c_address=SSD1306_I2C_ADDRESS,
+                 chunk_size=SSD1306_DEFAULT_CHUNK_SIZE, double_buffer=False):
         # Call base class constructor.
-        super(SSD1306_128_32, self).__init__(128, 32, i2c_address, busnum)
+        super(SSD1306_128_32, self).__init__(128, 32, i2c_address, busnum, chunk_size,
+                                             double_buffer)
 
     def _initialize(self):
         # 128x32 pixel specific initialization.
-        self.command(SSD1306_DISPLAYOFF)                    # 0xAE
-        self.command(SSD1306_SETDISPLAYCLOCKDIV)            # 0xD5
-        self.command(0x80)                                  # the suggested ratio 0x80
-        self.command(SSD1306_SETMULTIPLEX)                  # 0xA8
-        self.command(0x1F)
-        self.command(SSD1306_SETDISPLAYOFFSET)              # 0xD3
-        self.command(0x0)                                   # no offset
-        self.command(SSD1306_SETSTARTLINE | 0x0)            # line #0
-        self.command(SSD1306_CHARGEPUMP)                    # 0x8D
-        if self._vccstate == SSD1306_EXTERNALVCC:
-            self.command(0x10)
-        else:
-            self.command(0x14)
-        self.command(SSD1306_MEMORYMODE)                    # 0x20
-        self.command(0x00)                                  # 0x0 act like ks0108
-        self.command(SSD1306_SEGREMAP | 0x1)
-        self.command(SSD1306_COMSCANDEC)
-        self.command(SSD1306_SETCOMPINS)                    # 0xDA
-        self.command(0x02)
-        self.command(SSD1306_SETCONTRAST)                   # 0x81
-        self.command(0x8F)
-        self.command(SSD1306_SETPRECHARGE)                  # 0xd9
         if self._vccstate == SSD1306_EXTERNALVCC:
-            self.command(0x22)
+            chargepump, precharge = 0x10, 0x22
         else:
-            self.command(0xF1)
-        self.command(SSD1306_SETVCOMDETECT)                 # 0xDB
-        self.command(0x40)
-        self.command(SSD1306_DISPLAYALLON_RESUME)           # 0xA4
-        self.command(SSD1306_NORMALDISPLAY)                 # 0xA6
+            chargepump, precharge = 0x14, 0xF1
+        self.send_commands([
+            SSD1306_DISPLAYOFF,                 # 0xAE
+            SSD1306_SETDISPLAYCLOCKDIV,         # 0xD5
+            0x80,                               # the suggested ratio 0x80
+            SSD1306_SETMULTIPLEX,               # 0xA8
+            0x1F,
+            SSD1306_SETDISPLAYOFFSET,           # 0xD3
+            0x0,                                # no offset
+            SSD1306_SETSTARTLINE | 0x0,         # line #0
+            SSD1306_CHARGEPUMP,                 # 0x8D
+            chargepump,
+            SSD1306_MEMORYMODE,                 # 0x20
+            0x00,                               # 0x0 act like ks0108
+            SSD1306_SEGREMAP | 0x1,
+            SSD1306_COMSCANDEC,
+            SSD1306_SETCOMPINS,                 # 0xDA
+            0x02,
+            SSD1306_SETCONTRAST,                # 0x81
+            0x8F,
+            SSD1306_SETPRECHARGE,               # 0xd9
+            precharge,
+            SSD1306_SETVCOMDETECT,              # 0xDB
+            0x40,
+            SSD1306_DISPLAYALLON_RESUME,        # 0xA4
+            SSD1306_NORMALDISPLAY               # 0xA6
+        ])
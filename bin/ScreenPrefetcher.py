@@ -0,0 +1,84 @@
+import logging
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from bin.Utils import Utils
+
+
+class ScreenPrefetcher:
+    '''
+        Refreshes the data of the screen expected to be shown next on a worker
+        thread while the current screen is on display, so slow commands or
+        Supervisor requests no longer hold up the switch between screens.
+        Refreshes run on daemon threads, so one that hangs cannot keep the
+        process from exiting.
+    '''
+    # seconds take() waits for a prefetch before showing the previous data
+    timeout = 5
+
+    logger = logging.getLogger('Config')
+
+    def __init__(self, get_screen):
+        self.get_screen = get_screen
+        self.hits = 0
+        self.misses = 0
+        self._pending = None
+        # refreshes started and not yet finished, by screen name
+        self._running = {}
+        self._closed = False
+
+    def prefetch(self, name):
+        ''' start refreshing name's data in the background '''
+        if self._closed or (self._pending and self._pending[0] == name):
+            return
+
+        future = self._running.get(name)
+        # a refresh still running for an earlier showing is waited for rather than doubled up
+        if future is None or future.done():
+            # screens are created here rather than on the worker thread
+            screen = self.get_screen(name)
+            future = Utils.run_in_daemon_thread('Prefetch', screen.refresh)
+            self._running[name] = future
+        self._pending = (name, future)
+
+    def take(self, name):
+        '''
+            :return: True when name's data was prefetched, waiting up to timeout
+            for it if it is still being fetched. A screen which already has data
+            is shown with it when the prefetch runs late.
+        '''
+        pending, self._pending = self._pending, None
+        if pending is None or pending[0] != name:
+            self.misses += 1
+            return False
+
+        try:
+            pending[1].result(ScreenPrefetcher.timeout)
+        except FutureTimeoutError:
+            self.misses += 1
+            previous = self.get_screen(name).data is not None
+            ScreenPrefetcher.logger.warning("'" + name + "' took longer than " + str(ScreenPrefetcher.timeout)
+                                            + " seconds to prefetch"
+                                            + (", showing its previous data" if previous else ""))
+            return previous
+        except CancelledError:
+            self.misses += 1
+            return False
+        except Exception as e:
+            ScreenPrefetcher.logger.warning("Could not prefetch '" + name + "': " + str(e))
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def close(self):
+        ''' stop prefetching and wake a take() waiting on a refresh, which is left to finish on its own '''
+        self._closed = True
+        self._pending = None
+        for future in self._running.values():
+            future.cancel()
+        self._running = {}
+
+    def report(self):
+        return f"{self.hits} screens prefetched, {self.misses} missed"
@@ -0,0 +1,36 @@
+import logging
+
+
+class ScreenRegistry:
+    '''
+        Keeps one instance of each screen for the life of the process, so
+        icons, compiled text and other per-screen state survive between
+        rotations. Screens are built on first use by the given factory.
+    '''
+    logger = logging.getLogger('Config')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._screens = {}
+
+    def __contains__(self, name):
+        return str(name).lower() in self._screens
+
+    def get(self, name):
+        ''' :return: the screen called name, created the first time it is asked for '''
+        name = str(name).lower()
+        if name not in self._screens:
+            self._screens[name] = self.factory(name)
+            ScreenRegistry.logger.info("'" + name + "' registered")
+        return self._screens[name]
+
+    def remove(self, name):
+        name = str(name).lower()
+        if self._screens.pop(name, None) is not None:
+            ScreenRegistry.logger.info("'" + name + "' unregistered")
+
+    def clear(self):
+        self._screens.clear()
+
+    def names(self):
+        return list(self._screens)
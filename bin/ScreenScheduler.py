@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+
+Schedule = namedtuple('Schedule', ['priority', 'min_interval', 'max_interval'])
+
+
+class ScreenScheduler:
+    '''
+        Decides which screen is shown next. Screens wait in a heap ordered by
+        when they are next due. Of the screens that are due, one kept waiting
+        past its maximum interval goes first, then the highest priority, then
+        the one due the longest. When nothing is due the scheduler sleeps on
+        an event, so it uses no CPU and wakes as soon as it is stopped.
+    '''
+    logger = logging.getLogger('Config')
+
+    def __init__(self, stop_event = None):
+        self.stop_event = stop_event if stop_event else threading.Event()
+        self._heap = []
+        self._schedules = {}
+        self._last_shown = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def add(self, name, priority = 0, min_interval = 0, max_interval = None):
+        '''
+            Queue a screen, due now. It is shown at most once every min_interval
+            seconds, and ahead of higher priority screens once max_interval
+            seconds have passed since it was last shown.
+        '''
+        self._schedules[name] = Schedule(int(priority), float(min_interval),
+                                         float(max_interval) if max_interval else None)
+        self._push(name, time.monotonic())
+
+    def remove(self, name):
+        ''' stop scheduling name; its queued entry is discarded when it comes up '''
+        self._schedules.pop(name, None)
+        self._last_shown.pop(name, None)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def next(self):
+        ''' wait for the next screen to become due, :return: its name, or None once stopped '''
+        idle_logged = False
+        while not self.stop_event.is_set():
+            name = self.poll()
+            if name is not None:
+                return name
+
+            if not self._schedules and not idle_logged:
+                idle_logged = True
+                ScreenScheduler.logger.info('No screens left to schedule, waiting to exit')
+
+            self.stop_event.wait(self.time_until_due())
+
+        return None
+
+    def poll(self):
+        ''' :return: the screen to show now, or None when no screen is due yet '''
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if entry[2] in self._schedules:
+                due.append(entry)
+
+        if not due:
+            return None
+
+        chosen = min(due, key=lambda entry: self._rank(entry, now))
+        for entry in due:
+            if entry is not chosen:
+                heapq.heappush(self._heap, entry)
+        self._last_shown[chosen[2]] = now
+        return chosen[2]
+
+    def time_until_due(self):
+        ''' :return: seconds until the earliest queued screen is due, or None when none is queued '''
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def peek(self):
+        ''' :return: the screen expected to be shown next, without waiting for it '''
+        entries = [entry for entry in self._heap if entry[2] in self._schedules]
+        if not entries:
+            return None
+
+        at = max(time.monotonic(), min(entries)[0])
+        due = [entry for entry in entries if entry[0] <= at]
+        return min(due, key=lambda entry: self._rank(entry, at))[2]
+
+    def done(self, name):
+        ''' queue name again after it has been shown '''
+        if name in self._schedules:
+            started = self._last_shown.get(name, 0.0)
+            self._push(name, max(time.monotonic(), started + self._schedules[name].min_interval))
+
+    def _push(self, name, due):
+        heapq.heappush(self._heap, (due, next(self._counter), name))
+
+    def _rank(self, entry, now):
+        schedule = self._schedules[entry[2]]
+        last_shown = self._last_shown.get(entry[2])
+        overdue = (schedule.max_interval is not None and last_shown is not None
+                   and now - last_shown >= schedule.max_interval)
+        return (not overdue, -schedule.priority, entry[0], entry[1])
@@ -1,11 +1,18 @@
+import asyncio
 import logging
 import textwrap
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
+from bin.FrameFlusher import FrameFlusher
+from bin.FrameScheduler import FrameScheduler
+from bin.Layout import ImageRegion, Layout, Region, TextRegion
+from bin.Metrics import Metrics
 from bin.Scroller import Scroller
 from bin.SSD1306 import SSD1306_128_32 as SSD1306
+from bin.SSD1306 import SSD1306_DEFAULT_CHUNK_SIZE
 from bin.Utils import Utils
 
 
@@ -14,14 +21,22 @@ class Display:
     SCREENSHOT_PATH = "./img/examples/"
 
     def __init__(self, busnum = None, screenshot = False, rotate = False, show_icons = True,
-                 compact = False, show_hint = False):
+                 compact = False, show_hint = False, chunk_size = None,
+                 hardware_scroll = False, double_buffer = False, async_flush = False):
         self.logger = logging.getLogger('Display')
 
         if not isinstance(busnum, int):
             busnum = Display.DEFAULT_BUSNUM
 
-        self.display = SSD1306(busnum)
+        if not isinstance(chunk_size, int):
+            chunk_size = SSD1306_DEFAULT_CHUNK_SIZE
+
+        self.display = SSD1306(busnum, chunk_size=chunk_size,
+                               double_buffer=bool(double_buffer))
+        self.flusher = None
         self.clear()
+        if async_flush:
+            self.flusher = FrameFlusher(self.display)
         self.width = self.display.width
         self.height = self.display.height
         self.rotate = rotate
@@ -30,6 +45,7 @@ class Display:
         self.show_icons = show_icons
         self.show_hint = show_hint
         self.hint_right = True
+        self.hardware_scroll = bool(hardware_scroll)
 
         if self.show_icons and self.show_hint:
            self.logger.error("show_icons and show_hint both True; turning off hint")
@@ -38,8 +54,17 @@ class Display:
         self.image = Image.new("1", (self.width, self.height))
         self.draw = ImageDraw.Draw(self.image)
         self.screenshot = screenshot
+        # called once, when the first frame is shown
+        self.on_first_frame = None
+        self.first_frame_shown = False
+
+    def flush(self):
+        """ wait for frames handed to the background flusher to be sent """
+        if self.flusher:
+            self.flusher.flush()
 
     def clear(self):
+        self.flush()
         self.display.begin()
         self.display.clear()
         self.display.display()
@@ -47,13 +72,44 @@ class Display:
     def prepare(self):
         self.draw.rectangle((0, 0, self.width, self.height), outline = 0, fill = 0)
 
-    def show(self):
-        if isinstance(self.rotate, int):
-            self.image = self.image.rotate(self.rotate)
-            self.draw = ImageDraw.Draw(self.image)
-
-        self.display.image(self.image)
-        self.display.display()
+    def show(self, regions = None):
+        """ send the canvas to the display; regions optionally lists the (x0, y0, x1, y1)
+            rectangles changed since the last frame, so only those are converted and compared """
+        frame = self.image
+        if isinstance(self.rotate, int) and self.rotate % 360:
+            frame = self.image.rotate(self.rotate)
+            regions = self.rotate_regions(regions)
+        elif self.flusher:
+            frame = self.image.copy()
+
+        if self.flusher:
+            self.flusher.submit(frame, regions)
+        else:
+            self.display.image(frame, regions)
+            self.display.display()
+
+        if not self.first_frame_shown:
+            self.first_frame_shown = True
+            if self.on_first_frame:
+                self.on_first_frame()
+
+    def rotate_regions(self, regions):
+        """ map canvas rectangles onto the panel, None unless the rotation is a half turn """
+        if regions is None or self.rotate % 360 != 180:
+            return None
+        return [(self.width - x1, self.height - y1, self.width - x0, self.height - y0)
+                for x0, y0, x1, y1 in regions]
+
+    def start_scroll(self):
+        """ scroll the shown image right to left using the panel's scroll engine """
+        # a 180 degree rotation flips the panel, so scroll the other way
+        left = not (isinstance(self.rotate, int) and self.rotate % 360 == 180)
+        self.flush()
+        self.display.start_scroll(left)
+
+    def stop_scroll(self):
+        self.flush()
+        self.display.stop_scroll()
 
     def capture_screenshot(self, name):
         if self.screenshot:
@@ -70,18 +126,34 @@ class BaseScreen:
     font_path = Utils.current_dir + "/fonts/DejaVuSans.ttf"
     font_bold_path = Utils.current_dir + "/fonts/DejaVuSans-Bold.ttf"
     fonts = {}
+    # seconds between live updates of the shown values, 0 shows a single frame
+    refresh_interval = 0
 
-    def __init__(self, duration, display = Display(), utils = Utils(), config = None):
-        self.display = display
+    def __init__(self, duration, display = None, utils = None, config = None):
+        self._display = display
         self.duration = duration
-        self.utils = utils
+        self.utils = utils if utils else Utils
         self.config = config
+        self.data = None
+        self.layout = None
+        self.layout_lines = 0
         self.hint = None
         self.icon = None
         self.font_size = 8
         self.logger = logging.getLogger('Screen')
         self.logger.info("'" + self.__class__.__name__ + "' created")
 
+    @property
+    def display(self):
+        """ the display to draw on, opened on first use when none was given """
+        if self._display is None:
+            self._display = Display()
+        return self._display
+
+    @display.setter
+    def display(self, display):
+        self._display = display
+
     @property
     def name(self):
         return str(self.__class__.__name__).lower().replace("screen", "")
@@ -163,22 +235,61 @@ class BaseScreen:
        if not self.hint or not self.display.show_hint:
            return
 
-       # determine whether to put hints on right or left
-       x_pos = 0
+       self.draw_hint(self.display, self.hint)
+
+    @property
+    def hint_x(self):
+       """ determine whether to put hints on right or left """
        if self.display.hint_right:
-          x_pos = 119
+          return 119
+       return 0
+
+    def draw_hint(self, display, hint):
+       x_pos = self.hint_x
        font = self.font(size=11, is_bold=True)
 
-       draw = self.display.draw
+       draw = display.draw
        draw.rectangle((x_pos, 0, x_pos + 10, 32), outline = 255, fill = 255)
 
        # display the text based on how many characters the hint is
        text_fill = 0
-       draw.text((x_pos, -2), self.hint[0], font=font, fill=text_fill)
-       if (len(self.hint) > 1):
-           draw.text((x_pos, 8), self.hint[1], font=font, fill=text_fill)
-       if (len(self.hint) > 2):
-           draw.text((x_pos, 18), self.hint[2], font=font, fill=text_fill)
+       draw.text((x_pos, -2), hint[0], font=font, fill=text_fill)
+       if (len(hint) > 1):
+           draw.text((x_pos, 8), hint[1], font=font, fill=text_fill)
+       if (len(hint) > 2):
+           draw.text((x_pos, 18), hint[2], font=font, fill=text_fill)
+
+    def create_layout(self, num_lines):
+        """ regions for the icon, the hint and num_lines lines of text, placed as display_text does """
+        self.set_text_lines(num_lines)
+        layout = Layout(self.display)
+        layout.add(ImageRegion('icon', (-3, 3)))
+        layout.add(Region('hint', draw=self.draw_hint,
+                          bbox=lambda display, hint: (self.hint_x, 0, self.hint_x + 11, 33)))
+
+        font = self.font()
+        for line, y in enumerate(self.text_y):
+            layout.add(TextRegion('line' + str(line), (self.text_indent, y), font))
+        return layout
+
+    def update_text(self, text_lines):
+        """ Show the icon, hint and text lines through the screen's layout,
+            redrawing and sending only the regions whose values changed.
+            :return: the rectangles of the canvas that changed """
+        text_lines = text_lines[:3]
+        if not self.layout or self.layout_lines != len(text_lines):
+            self.layout = self.create_layout(len(text_lines))
+            self.layout_lines = len(text_lines)
+
+        self.layout.update('icon', self.icon if self.display.show_icons else None)
+        self.layout.update('hint', self.hint if self.display.show_hint else None)
+        for line, text in enumerate(text_lines):
+            self.layout.update('line' + str(line), text)
+
+        regions = self.layout.render()
+        if regions:
+            self.display.show(regions)
+        return regions
 
     def font(self, size = None, is_bold = False):
         # default to the current screen's font size if none provided
@@ -214,7 +325,79 @@ class BaseScreen:
 
         self.capture_screenshot()
         self.display.show()
-        time.sleep(self.duration)
+        self.wait(self.duration)
+
+    def wait(self, seconds):
+        """ sleep for seconds, waking early when the display is shutting down """
+        shutdown = getattr(self.config, 'shutdown', None)
+        if shutdown:
+            shutdown.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def render_live(self):
+        """ Show the screen for its duration, reading its data again every
+            refresh_interval seconds and redrawing only the text that changed.
+            The data is read with get_data() on a daemon thread, so a collect
+            that runs late keeps the shown values until the next refresh """
+        timer = time.monotonic() + self.duration
+        self.update_text(self.format_lines(self.data))
+        self.capture_screenshot()
+        pending = None
+
+        while self.config.allow_screen_render(self.name):
+            remaining = timer - time.monotonic()
+            if remaining <= 0:
+                break
+            self.wait(min(self.refresh_interval, remaining))
+            if time.monotonic() >= timer or not self.config.allow_screen_render(self.name):
+                break
+
+            # a read which ran late at the last refresh is waited on again rather than doubled up
+            if pending is None:
+                pending = Utils.run_in_daemon_thread('Refresh', self.get_data)
+            # waiting no longer than the screen is still shown
+            timeout = min(self.refresh_interval, max(timer - time.monotonic(), 0))
+            try:
+                self.data = pending.result(timeout)
+            except FutureTimeoutError:
+                if timeout == self.refresh_interval:
+                    self.logger.warning("'" + self.__class__.__name__ + "' data took longer than "
+                                        + str(self.refresh_interval) + " seconds to refresh")
+                continue
+            except Exception as e:
+                self.logger.warning("'" + self.__class__.__name__ + "' could not refresh: " + str(e))
+            else:
+                self.update_text(self.format_lines(self.data))
+            pending = None
+
+    def format_lines(self, data):
+        """ the lines of text showing data, for screens which support live updates """
+        raise NotImplementedError
+
+    def collect(self):
+        """ gather the data this screen displays; screens without data return None """
+        return None
+
+    def get_data(self):
+        """ the latest background sample of this screen's data, collected now if there is none """
+        sampler = getattr(self.config, 'sampler', None)
+        if sampler:
+            data = sampler.get(self.name)
+            if data is not None:
+                return data
+        return self.collect()
+
+    def refresh(self):
+        """ update the data shown by the next render, called before each rotation of the screen """
+        self.data = self.get_data()
+        return self.data
+
+    async def fetch(self):
+        """ refresh the data without blocking the event loop; screens with async sources can override this.
+            The refresh runs on a daemon thread rather than the loop's executor, which
+            asyncio.run() joins on exit, so a source that hangs cannot hold up the exit """
+        return await asyncio.wrap_future(Utils.run_in_daemon_thread('Fetch', self.refresh))
 
     def render(self):
         self.display.show()
@@ -223,22 +406,65 @@ class BaseScreen:
         if not startpos:
             startpos = self.display.width
         scroller = Scroller(text, startpos, font, self.display, amplitude)
-        timer = time.time() + self.duration
+        if self.can_hardware_scroll(scroller):
+            self.render_hardware_scroller(scroller)
+            return
+
+        timer = time.monotonic() + self.duration
+        scheduler = FrameScheduler()
+        captured = False
         while self.config.allow_screen_render(self.name):
             self.display.prepare()
             scroller.render()
             self.display.show()
 
-            if scroller.pos == 2:
+            if not captured and scroller.pos <= 2:
+                captured = True
                 self.capture_screenshot()
 
-            if not self.config.allow_screen_render(self.name) or not scroller.move_for_next_frame(time.time() < timer):
+            elapsed = scheduler.wait()
+            if not self.config.allow_screen_render(self.name) or not scroller.move_for_next_frame(time.monotonic() < timer, elapsed):
                 break
 
-    def run(self):
+        if scheduler.skipped:
+            self.logger.info("'" + self.__class__.__name__ + "' skipped " + str(scheduler.skipped) + " frames")
+
+    def can_hardware_scroll(self, scroller):
+        """ the panel can only rotate flat text which fits in its 128 column GDDRAM """
+        return (self.display.hardware_scroll and not scroller.amplitude
+                and scroller.maxwidth <= self.display.width)
+
+    def render_hardware_scroller(self, scroller):
+        """ upload the text once and let the panel scroll it for the screen duration """
+        self.display.prepare()
+        scroller.pos = (self.display.width - scroller.maxwidth) // 2
+        scroller.render()
+        self.display.show()
+        self.capture_screenshot()
+
+        self.display.start_scroll()
+        try:
+            if self.config.allow_screen_render(self.name):
+                self.wait(self.duration)
+        finally:
+            self.display.stop_scroll()
+
+    def run(self, prefetched = False):
+        """ show the screen, refreshing its data first unless it has already been prefetched """
         self.logger.info("'" + self.__class__.__name__ + "' rendering")
+        if not prefetched:
+            self.refresh()
+        # the canvas has been drawn on since this screen's last turn
+        if self.layout:
+            self.layout.invalidate()
+        # report the frames of this screen alone
+        if self.display.flusher:
+            self.display.flusher.reset()
         self.display.prepare()
         self.render()
+        if self.display.flusher:
+            self.logger.info("'" + self.__class__.__name__ + "' " + self.display.flusher.report())
+        self.logger.info("Text metrics cache: " + Utils.text_metrics.report())
         self.logger.info("'" + self.__class__.__name__ + "' completed")
 
 class StaticScreen(BaseScreen):
@@ -248,19 +474,21 @@ class StaticScreen(BaseScreen):
             self.text = self.default_message
             self.logger.info("No static text found")
 
-        if not self._text_compiled:
-            self._text_compiled = True
-            self._text = self.utils.compile_text(self._text)
-            self.logger.info(f"Static screen text compiled: '{self._text}'")
-
-        return self._text
+        return self._template.render()
 
     @text.setter
     def text(self, text):
         self._text = str(text)
-        self._text_compiled = False
+        self._template = self.utils.compile_template(self._text)
         self.logger.info(f"Static screen text: '{self._text}' added")
 
+    def refresh(self):
+        """ resolve the text placeholders, which may look up the Supervisor API.
+            The template keeps the slow values, render() resolves it again so
+            values such as {datetime} are current when shown """
+        self.data = self.text
+        return self.data
+
     @property
     def noscroll(self):
         if not hasattr(self, '_noscroll'):
@@ -284,13 +512,14 @@ class StaticScreen(BaseScreen):
     #     self.logger.info("Static screen amplitude: '" + str(self._amplitude) + "' set")
 
     def capture_screenshot(self):
-        slug = Utils.slugify(self.text)
+        slug = Utils.slugify(self.data)
         super().capture_screenshot("static_" + slug)
 
     def render(self):
         self.display.prepare()
         font = self.font(size=16)
-        text = self.text
+        # resolved again, as the refresh may have been prefetched a screen earlier
+        text = self.data = self.text
         # amplitude = self.amplitude
 
         self.logger.info("Rendering static text: " + text)
@@ -320,7 +549,7 @@ class StaticScreen(BaseScreen):
                     y_text += (height + text_leading)
             else:
                 x, y = Utils.get_text_center(self.display, text, font)
-                self.display.draw.text((x, y), self.text, font=font, fill=255)
+                self.display.draw.text((x, y), text, font=font, fill=255)
 
             self.render_with_defaults()
 
@@ -331,19 +560,20 @@ class WelcomeScreen(BaseScreen):
             self.text = self.default_message
             self.logger.info("No configured welcome text found")
 
-        if not self._text_compiled:
-            self._text_compiled = True
-            self._text = self.utils.compile_text(self._text)
-            self.logger.info("Welcome screen text compiled: '" + self._text + "'")
-
-        return self._text
+        return self._template.render()
 
     @text.setter
     def text(self, text):
         self._text = str(text)
-        self._text_compiled = False
+        self._template = self.utils.compile_template(self._text)
         self.logger.info("Welcome screen text: '" + self._text + "' added")
 
+    def refresh(self):
+        """ resolve the text placeholders, which may look up the hostname.
+            render() resolves them again so the shown values are current """
+        self.data = self.text
+        return self.data
+
     def render(self):
         '''
         Animated welcome screen
@@ -351,27 +581,36 @@ class WelcomeScreen(BaseScreen):
         '''
         height = self.display.height
         font = self.font(size=16)
-        self.render_scroller(self.text, font)
+        self.data = self.text
+        self.render_scroller(self.data, font)
 
 class SplashScreen(BaseScreen):
-    img = Image.open(r"" + Utils.current_dir + "/img/home-assistant-logo.png")
+    logo_path = "/img/home-assistant-logo.png"
+    logos = {}
+
+    @staticmethod
+    def logo(size):
+        """ the inverted Home Assistant logo at size, loaded on first use """
+        if size not in SplashScreen.logos:
+            img = Image.open(r"" + Utils.current_dir + SplashScreen.logo_path)
+            SplashScreen.logos[size] = ImageOps.invert(img.resize([size, size]))
+        return SplashScreen.logos[size]
 
-    def __init__(self, duration, display = Display(), utils = Utils(), config = None):
-        super().__init__(duration, display, utils, config)
+    def collect(self):
+        return Metrics.get_hassio(self.utils)
 
     def render(self):
         '''
             Home Assistant screen. 
             If you're not using Home Assistant OS, disable this screen in the config
         '''
-        os_info = self.utils.hassos_get_info('os/info')
+        hostname, os_info, core_info = self.data
         os_version = os_info['data']['version']
         os_upgrade = os_info['data']['update_available']  
 
         if (os_upgrade == True):
             os_version = os_version + "*"
 
-        core_info = self.utils.hassos_get_info('core/info')
         core_version = core_info['data']['version']  
         core_upgrade = os_info['data']['update_available']
         if (core_upgrade == True):
@@ -382,14 +621,13 @@ class SplashScreen(BaseScreen):
         textbox_x = img_size + padding
 
         # Get HA Logo and Resize
-        logo = self.img.resize([img_size, img_size])
-        logo = ImageOps.invert(logo)  
+        logo = SplashScreen.logo(img_size)
 
         # Merge HA Logo with Canvas.
         self.display.image.paste(logo,(-2,3))
         self.display.draw.line([(textbox_x, 16),(123,16)], fill=255, width=1)
 
-        ln1 = self.utils.get_hostname()
+        ln1 = hostname
         ln1_font = self.font(size=9, is_bold=True)
         self.display.draw.text((textbox_x, 2), ln1, font=ln1_font, fill=255)
 
@@ -401,12 +639,14 @@ class SplashScreen(BaseScreen):
         self.render_with_defaults()
 
 class NetworkScreen(BaseScreen):
+    def collect(self):
+        return Metrics.get_network(self.utils)
+
     def render(self):
         self.hint = 'NET'
         self.set_icon('/img/ip-network.png')
 
-        hostname = self.utils.get_hostname()
-        ipv4 = self.utils.get_ip()
+        hostname, ipv4 = self.data
 
         self.display_text([ hostname, ipv4 ])
         #self.display_text([ hostname, ipv4, mac.upper() ])
@@ -414,54 +654,65 @@ class NetworkScreen(BaseScreen):
         self.render_with_defaults()
 
 class StorageScreen(BaseScreen):
-    def render(self):
-        self.hint = 'DSK'
-        self.set_icon('/img/harddisk.png')
-        drive = '/'
+    drive = '/'
 
-        #storage = Utils.shell_cmd('df -h | awk \'$NF=="/"{printf "%d,%d,%s", $3,$2,$5}\'')
-        storage = Utils.shell_cmd('df ' + drive + ' | awk \'$NF=="/"{printf "%d,%d,%s", $3,$2,$5,$6}\'')
-        storage = storage.split(',')
+    def collect(self):
+        return Metrics.get_storage(self.drive)
 
+    def format_lines(self, storage):
         used = int(storage[0]) / (1024 * 1024)
         total = int(storage[1]) / (1024 * 1024)
         free = total - used
         free_pct = 100 * (free / total)
 
-        indent = self.text_indent
         if self.display.compact:
-           self.display_text([ f"{round(used,1):.1f} / {round(total,0):.0f} GB",
-                               f"{free_pct:.1f}% Free" ])
-        else:
-           self.display_text([
+           return [ f"{round(used,1):.1f} / {round(total,0):.0f} GB",
+                    f"{free_pct:.1f}% Free" ]
+        return [
              f"USED: {round(used,1):.1f} GB",
              f"TOTAL: {round(total,1):.1f} GB",
-             f"UTILISED: {storage[2]}" ])
+             f"UTILISED: {storage[2]}" ]
 
+    def render(self):
+        self.hint = 'DSK'
+        self.set_icon('/img/harddisk.png')
+
+        if self.refresh_interval:
+           self.render_live()
+           return
+
+        self.display_text(self.format_lines(self.data))
         self.render_with_defaults()
 
 class MemoryScreen(BaseScreen):
-    def render(self):
-        self.hint = 'MEM'
-        self.set_icon("/img/memory.png")
+    def collect(self):
+        return Metrics.get_memory()
 
-        mem = Utils.shell_cmd("free -m | awk 'NR==2{printf \"%.1f,%.1f,%.0f%%\", $3/1000,$2/1000,$3*100/$2 }'")
-        mem = mem.split(',')
+    def format_lines(self, memory):
+        used_mb, total_mb = memory
 
-        used = float(mem[0])
-        total = float(mem[1])
+        used = round(used_mb / 1000, 1)
+        total = round(total_mb / 1000, 1)
         free_pct = 100 * (total - used) / total
+        used_pct = f"{used_mb * 100 / total_mb:.0f}%"
 
-        indent = self.text_indent
         if self.display.compact:
-           self.display_text([ f"{round(used,1):.1f} / {round(total,1):.1f} GB",
-                               f"{free_pct:.1f}% Free" ])
-        else:
-           self.display_text([
+           return [ f"{round(used,1):.1f} / {round(total,1):.1f} GB",
+                    f"{free_pct:.1f}% Free" ]
+        return [
              f"USED: {used} GB",
              f"TOTAL: {total} GB",
-             f"UTILISED: {mem[2]}" ])
+             f"UTILISED: {used_pct}" ]
 
+    def render(self):
+        self.hint = 'MEM'
+        self.set_icon("/img/memory.png")
+
+        if self.refresh_interval:
+           self.render_live()
+           return
+
+        self.display_text(self.format_lines(self.data))
         self.render_with_defaults()
 
 class CpuScreen(BaseScreen):
@@ -470,35 +721,39 @@ class CpuScreen(BaseScreen):
         if unit in ['C', 'F']:
             self.temp_unit = unit
 
-    def get_temp(self):
-        temp = float(Utils.shell_cmd("cat /sys/class/thermal/thermal_zone0/temp")) / 1000.00
+    def format_temp(self, temp):
         if (hasattr(self, 'temp_unit') and self.temp_unit == 'F'):
             temp = "%0.1f °F" % (temp * 9.0 / 5.0 + 32)
         else:
             temp = "%0.1f °C" % (temp)
         return temp
 
-    def render(self):
-        self.hint = 'CPU'
-        self.set_icon("/img/cpu.png") 
+    def collect(self):
+        return Metrics.get_cpu()
 
-        # switched from top -bn1 to uptime to reduce CPU consumption by 60%
-        cpu = Utils.shell_cmd("uptime | grep -i load | awk '{printf \"%.2f,%.2f,%.2f\", $(NF-2),$(NF-1),$(NF)}'")
-        cpu = cpu.split(',')
+    def format_lines(self, info):
+        cpu = [f"{load:.2f}" for load in info.load]
 
-        uptime = Utils.shell_cmd("uptime | grep -ohe 'up .*' | sed 's/,//g' | awk '{ print $2" "$3 }'")
+        uptime = Metrics.format_uptime(info.uptime)
 
         # Check temperature unit and convert if required.
-        temp = self.get_temp()
+        temp = self.format_temp(info.temperature)
 
-        indent = self.text_indent
         if self.display.compact:
-           self.display_text([ f"{temp}",
-                               f"{cpu[0]} {cpu[1]}" ])
-        else:
-           self.display_text([ f"TEMP: {temp}",
-                               f"LOAD: {cpu[0]}",
-                               uptime.upper() ])
+           return [ f"{temp}",
+                    f"{cpu[0]} {cpu[1]}" ]
+        return [ f"TEMP: {temp}",
+                 f"LOAD: {cpu[0]}",
+                 uptime.upper() ]
+
+    def render(self):
+        self.hint = 'CPU'
+        self.set_icon("/img/cpu.png") 
+
+        if self.refresh_interval:
+           self.render_live()
+           return
 
+        self.display_text(self.format_lines(self.data))
         self.render_with_defaults()
 
@@ -1,16 +1,21 @@
+import bisect
 import logging
 import math
 
+from PIL import Image, ImageDraw
+
 from bin.Utils import Utils
 
 
 class Scroller:
     default_amplitude = 0
+    default_speed = 60
 
-    def __init__(self, text, startpos, font, display, amplitude = None, velocity = -2):
+    def __init__(self, text, startpos, font, display, amplitude = None, speed = None):
         self.text = text
         self.display = display
-        self.velocity = velocity
+        # pixels per second, moving left
+        self.velocity = -float(speed if speed else Scroller.default_speed)
         self.startpos = startpos
         self.pos = startpos
         self.font = font
@@ -18,33 +23,99 @@ class Scroller:
         self.logger = logging.getLogger('Scroller')
         unused, self.height_offset = Utils.get_text_center(display, text, font) # height/4
         self.maxwidth, unused = Utils.get_text_size(display, text, font)
+        self._prerender()
 
-    def render(self):
-        # Enumerate characters and draw them offset vertically based on a sine wave.
-        x = self.pos
-        for i, c in enumerate(self.text):
-            # Stop drawing if off the right side of screen.
-            if x > self.display.width:
-                break
+    def _prerender(self):
+        """ Rasterize the text once as one glyph image per character, laid out
+            the same way the characters are spaced when scrolling. Each glyph
+            image is cropped to its ink, which may reach past the character's
+            advance on either side; bearings holds where the ink starts. """
+        self.glyphs = []
+        self.bearings = []
+        self.offsets = []
+        self.ends = []
+        # glyphs are drawn with the fraction of the text's y position, as draw.text() would
+        y_fraction = self.height_offset - math.floor(self.height_offset)
+        rendered = {}
+        x = 0
+        end = 0
+        for c in self.text:
+            if c not in rendered:
+                rendered[c] = self._render_glyph(c, y_fraction)
+            glyph, bearing = rendered[c]
+            self.glyphs.append(glyph)
+            self.bearings.append(bearing)
+            self.offsets.append(x)
+            if glyph:
+                end = max(end, x + bearing[0] + glyph.width)
+            self.ends.append(end)
+            char_width, char_height = Utils.get_text_size(self.display, c, font=self.font)
+            x += char_width
 
-            # Calculate width but skip drawing if off the left side of screen.
-            if x < -10:
-                char_width, char_height = Utils.get_text_size(self.display, c, font=self.font)
-                x += char_width
-                continue
+        # a flat strip is pasted as one image, the glyphs' ink added together as draw.text() does
+        inked = [(x + bearing[0], bearing[1], glyph)
+                 for glyph, bearing, x in zip(self.glyphs, self.bearings, self.offsets) if glyph]
+        if inked:
+            left = min(x for x, y, glyph in inked)
+            top = min(y for x, y, glyph in inked)
+            right = max(x + glyph.width for x, y, glyph in inked)
+            bottom = max(y + glyph.height for x, y, glyph in inked)
+        else:
+            left, top, right, bottom = 0, 0, 1, 1
+        self.strip = Image.new("1", (right - left, bottom - top))
+        self.strip_bearing = (left, top)
+        for x, y, glyph in inked:
+            self.strip.paste(glyph, (x - left, y - top), glyph)
 
-            # Calculate offset from sine wave.
-            y = self.height_offset + math.floor(self.amplitude * math.sin(x / float(self.display.width) * 2.0 * math.pi))
+        # vertical sine offset for each position a visible character can be
+        # drawn at, from -width to width; the sine is not exactly periodic
+        # in floating point, so positions are not folded onto one period
+        width = self.display.width
+        self.wave = [self._wave(x) for x in range(-width, width + 1)]
 
-            # Draw text.
-            self.display.draw.text((x, y), c, font=self.font, fill=255)
+    def _wave(self, x):
+        return math.floor(self.amplitude * math.sin(x / float(self.display.width) * 2.0 * math.pi))
 
-            # Increment x position based on chacacter width.
-            char_width, char_height = Utils.get_text_size(self.display, c, font=self.font)
-            x += char_width
+    def _render_glyph(self, c, y_fraction):
+        """ :return: c's ink as an image and where it starts relative to the
+            character's position, or None for a character without ink """
+        left, top, right, bottom = Utils.text_metrics.textbbox(self.display, c, self.font)
+        # room for ink the measured box misses; the origin stays positive, as
+        # draw.text() truncates a negative position towards zero
+        pad = 2 + (self.font.size if hasattr(self.font, 'size') else 8) // 4
+        x = pad - min(left, 0)
+        y = pad - min(top, 0)
+        scratch = Image.new("1", (x + right + pad, y + bottom + pad))
+        ImageDraw.Draw(scratch).text((x, y + y_fraction), c, font=self.font, fill=255)
+        ink = scratch.getbbox()
+        if not ink:
+            return None, None
+        return scratch.crop(ink), (ink[0] - x, ink[1] - y)
+
+    def render(self):
+        y = math.floor(self.height_offset)
+        if not self.amplitude:
+            left, top = self.strip_bearing
+            self.display.image.paste(self.strip, (int(self.pos) + left, y + top))
+            return
+
+        # Paste the visible characters offset vertically based on a sine wave.
+        width = self.display.width
+        first = bisect.bisect_right(self.ends, -self.pos)
+        for i in range(first, len(self.glyphs)):
+            x = int(self.pos + self.offsets[i])
+            # Stop drawing if off the right side of screen.
+            if x > width:
+                break
+            glyph = self.glyphs[i]
+            if glyph:
+                left, top = self.bearings[i]
+                # the glyph is its own mask, so it adds to ink already drawn
+                wave = self.wave[x + width] if -width <= x <= width else self._wave(x)
+                self.display.image.paste(glyph, (x + left, y + top + wave), glyph)
 
-    def move_for_next_frame(self, allow_startover):
-        self.pos += self.velocity
+    def move_for_next_frame(self, allow_startover, elapsed):
+        self.pos += self.velocity * elapsed
         # Start over if text has scrolled completely off left side of screen.
         if self.has_completed():
             if allow_startover:
@@ -0,0 +1,144 @@
+import logging
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+class SupervisorClient:
+    '''
+        Home Assistant Supervisor API client. Requests reuse keep-alive
+        connections, responses are cached per endpoint for a TTL, concurrent
+        requests for the same endpoint share one call and independent
+        endpoints can be fetched in parallel.
+    '''
+    DEFAULT_URL = 'http://supervisor'
+    DEFAULT_TTL = 30
+    # endpoints whose data rarely changes are kept longer
+    TTLS = {
+        'host/info': 60,
+        'os/info': 300,
+        'core/info': 300,
+        'supervisor/info': 300
+    }
+    MAX_CONNECTIONS = 4
+
+    logger = logging.getLogger('Utils')
+
+    def __init__(self, base_url = None, token = None, timeout = 10):
+        url = urlsplit(base_url or SupervisorClient.DEFAULT_URL)
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.token = token if token is not None else SupervisorClient.environment_token()
+        self.requests = 0
+        self._cache = {}
+        self._inflight = {}
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=SupervisorClient.MAX_CONNECTIONS,
+                                            thread_name_prefix='Supervisor')
+
+    @staticmethod
+    def environment_token():
+        ''' :return: the API token the Supervisor gave this add-on, '' when there is none '''
+        # older Supervisors name it HASSIO_TOKEN
+        return os.environ.get('SUPERVISOR_TOKEN') or os.environ.get('HASSIO_TOKEN', '')
+
+    def ttl(self, endpoint):
+        return SupervisorClient.TTLS.get(endpoint, SupervisorClient.DEFAULT_TTL)
+
+    def invalidate(self, endpoint = None):
+        with self._lock:
+            if endpoint:
+                self._cache.pop(endpoint, None)
+            else:
+                self._cache.clear()
+
+    def get(self, endpoint):
+        ''' :return: the decoded JSON response of endpoint, e.g. 'os/info' '''
+        with self._lock:
+            entry = self._cache.get(endpoint)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+
+            future = self._inflight.get(endpoint)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[endpoint] = future
+
+        # only the first caller requests the endpoint, the rest wait for its answer
+        if leader:
+            try:
+                data = self._request(endpoint)
+                with self._lock:
+                    self._cache[endpoint] = (time.monotonic() + self.ttl(endpoint), data)
+                future.set_result(data)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[endpoint]
+
+        return future.result()
+
+    def get_many(self, endpoints):
+        ''' fetch several endpoints concurrently, :return: dict of endpoint to response '''
+        futures = {endpoint: self._executor.submit(self.get, endpoint) for endpoint in endpoints}
+        return {endpoint: future.result() for endpoint, future in futures.items()}
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def _acquire(self):
+        ''' :return: a connection and whether it was reused from the pool '''
+        with self._lock:
+            if self._connections:
+                return self._connections.pop(), True
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._connections) < SupervisorClient.MAX_CONNECTIONS:
+                self._connections.append(connection)
+                return
+        connection.close()
+
+    def _request(self, endpoint):
+        path = self.prefix + '/' + endpoint
+        headers = {
+            'Authorization': 'Bearer ' + self.token,
+            'Content-Type': 'application/json'
+        }
+        SupervisorClient.logger.info("Requesting data from '" + path + "'")
+
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                # the server may have dropped a pooled connection, so retry on a new one
+                if reused:
+                    continue
+                raise
+
+            self.requests += 1
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+
+            if response.status != 200:
+                raise Exception("'" + path + "' responded with " + str(response.status))
+            return json.loads(body)
@@ -1,19 +1,183 @@
 import logging
-import json
 import pathlib
 import re
+import socket
 import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
 from datetime import datetime
 
+from bin.SupervisorClient import SupervisorClient
+
+
+class TextMetricsCache:
+    '''
+        Bounded least recently used cache of text bounding boxes, keyed on the
+        text and the font face and size it is measured with.
+    '''
+    def __init__(self, maxsize = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, font):
+        path = getattr(font, 'path', None)
+        if path is None:
+            return (text, id(font))
+        return (text, path, getattr(font, 'size', None), getattr(font, 'index', None))
+
+    def textbbox(self, display, text, font):
+        key = TextMetricsCache.key(text, font)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        bbox = display.draw.textbbox((0, 0), text, font=font)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = bbox
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return bbox
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def report(self):
+        return f"{self.hits} hits, {self.misses} misses, {len(self._entries)} entries"
+
+
+class TextTemplate:
+    '''
+        Text with {placeholders}, parsed once into literal and placeholder
+        tokens. Each placeholder value is reused until its TTL expires, so
+        rendering again only looks up what may have changed.
+    '''
+    PLACEHOLDER = r'\{(?P<name>hostname|ip|datetime|hassio\.[a-z_]+\.[a-z_\.]+)\}'
+    # seconds a placeholder value is reused, keyed on the placeholder or its namespace.
+    # hostname and ip are cached by Utils.cached_identity, which honours
+    # Identity_Cache_TTL and interface changes, and hassio values by the
+    # SupervisorClient's per endpoint TTL, so none of them are kept here.
+    ttls = {
+        'datetime': 0,
+        'hostname': 0,
+        'ip': 0,
+        'hassio': 0
+    }
+
+    def __init__(self, text, utils, additional_replacements = {}):
+        self.text = text
+        self.utils = utils
+        self.additional_replacements = additional_replacements
+        pattern = TextTemplate.PLACEHOLDER
+        if additional_replacements:
+            # tried first, so they override the built in placeholders
+            pattern = "|".join([re.escape(key) for key in additional_replacements] + [pattern])
+
+        # tokens alternate between literal text (even) and placeholders (odd)
+        self.tokens = []
+        pos = 0
+        for match in re.finditer(pattern, text):
+            self.tokens.append(text[pos:match.start()])
+            self.tokens.append(match.group('name') or match.group(0))
+            pos = match.end()
+        self.tokens.append(text[pos:])
+        self.placeholders = set(self.tokens[1::2])
+        self._values = {}
+
+    @property
+    def is_static(self):
+        return not self.placeholders
+
+    def ttl(self, name):
+        return TextTemplate.ttls.get(name, TextTemplate.ttls.get(name.split('.')[0], 0))
+
+    def resolve(self, name):
+        now = time.monotonic()
+        entry = self._values.get(name)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        if name in self.additional_replacements:
+            value = self.additional_replacements[name](name)
+        elif name == 'hostname':
+            value = self.utils.get_hostname()
+        elif name == 'ip':
+            value = self.utils.get_ip()
+        elif name == 'datetime':
+            value = Utils.get_datetime()
+        elif hasattr(self.utils, 'get_hassio_info_property'):
+            value = self.utils.get_hassio_info_property(name[len('hassio.'):])
+        else:
+            # left as is when Home Assistant is not available
+            value = '{' + name + '}'
+
+        value = str(value)
+        self._values[name] = (now + self.ttl(name), value)
+        return value
+
+    def render(self):
+        if self.is_static:
+            return self.text
+        parts = list(self.tokens)
+        for i in range(1, len(parts), 2):
+            parts[i] = self.resolve(parts[i])
+        return ''.join(parts)
+
 
 class Utils:
     logger = logging.getLogger('Utils')
     current_dir = str(pathlib.Path(__file__).parent.parent.resolve())
+    text_metrics = TextMetricsCache()
+    # seconds a hostname / IP lookup is reused for
+    identity_ttl = 60
+    # also drop cached lookups as soon as network interfaces or routes change
+    identity_watch_interfaces = True
+    _identity_cache = {}
+    _interfaces_signature = None
 
     @staticmethod
     def shell_cmd(cmd):
         return subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8")
 
+    @staticmethod
+    def run_in_daemon_thread(name, function, *args):
+        '''
+            :return: a Future of function(*args) called on a daemon thread. Unlike
+            executor workers, which are joined at exit, a call that never returns
+            cannot keep the process alive. Cancelling the future wakes anyone
+            waiting on it, while the call itself runs on.
+        '''
+        future = Future()
+        def run():
+            try:
+                result = function(*args)
+            except Exception as e:
+                Utils._settle(future.set_exception, e)
+            else:
+                Utils._settle(future.set_result, result)
+
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return future
+
+    @staticmethod
+    def _settle(settle, outcome):
+        try:
+            settle(outcome)
+        except InvalidStateError:
+            # cancelled while running, nobody is waiting for the outcome
+            pass
+
     @staticmethod
     def get_text_center(display, text, font):
         w, h = Utils.get_text_size(display, text, font)
@@ -23,7 +187,7 @@ class Utils:
 
     @staticmethod
     def get_text_size(display, text, font):
-        left, top, right, bottom = display.draw.textbbox((0, 0), text, font=font)
+        left, top, right, bottom = Utils.text_metrics.textbbox(display, text, font)
         width = right - left if left > right else right - left
         height = top - bottom if bottom < top else bottom - top
         return [width, height]
@@ -33,9 +197,69 @@ class Utils:
         w, unused = Utils.get_text_size(display, text, font)
         return display.width < w
 
+    @staticmethod
+    def cached_identity(key, lookup):
+        ''' return the cached result of lookup() for key, calling it again once the TTL expires '''
+        if Utils.identity_watch_interfaces and Utils.interfaces_changed():
+            Utils.invalidate_identity()
+
+        now = time.monotonic()
+        entry = Utils._identity_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        value = lookup()
+        Utils._identity_cache[key] = (now + Utils.identity_ttl, value)
+        return value
+
+    @staticmethod
+    def invalidate_identity():
+        Utils._identity_cache = {}
+
+    @staticmethod
+    def local_addresses():
+        ''' :return: the IPv4 and IPv6 addresses assigned to this host's interfaces '''
+        addresses = set()
+        try:
+            with open('/proc/net/fib_trie', 'r') as f:
+                previous = ''
+                for line in f:
+                    # each local address is listed above a '/32 host LOCAL' line
+                    if line.split() == ['/32', 'host', 'LOCAL']:
+                        addresses.add(previous.split()[-1])
+                    previous = line
+        except OSError:
+            pass
+
+        try:
+            with open('/proc/net/if_inet6', 'r') as f:
+                for line in f:
+                    fields = line.split()
+                    addresses.add(fields[0] + '%' + fields[-1])
+        except OSError:
+            # IPv6 is disabled
+            pass
+        return frozenset(addresses)
+
+    @staticmethod
+    def interfaces_changed():
+        ''' :return: True when the interfaces, their addresses or the routing table differ from the previous call '''
+        try:
+            with open('/proc/net/route', 'r') as f:
+                routes = f.read()
+            signature = (tuple(socket.if_nameindex()), routes, Utils.local_addresses())
+        except OSError:
+            return False
+
+        changed = Utils._interfaces_signature is not None and signature != Utils._interfaces_signature
+        Utils._interfaces_signature = signature
+        if changed:
+            Utils.logger.info("Network interfaces changed")
+        return changed
+
     @staticmethod
     def get_hostname(opt = ""):
-        return str(Utils.shell_cmd("hostname " + opt + "| cut -d\' \' -f1")).strip()
+        return Utils.cached_identity(('hostname', opt), lambda: str(Utils.shell_cmd("hostname " + opt + "| cut -d\' \' -f1")).strip())
 
     @staticmethod
     def get_ip():
@@ -46,20 +270,18 @@ class Utils:
             format = Utils.datetime_format if hasattr(Utils, 'datetime_format') else "%d/%m/%Y %H:%M:%S"
         return datetime.now().strftime(format)
 
-    @staticmethod
-    def compile_text(text, additional_replacements = {}):
-        replacements = {
-            "{hostname}": lambda prop: Utils.get_hostname(),
-            "{ip}": lambda prop: Utils.get_ip(),
-            "{datetime}": lambda prop: Utils.get_datetime()
-        }
-        replacements = {**replacements, **additional_replacements}
-        regex = re.compile("(%s)" % "|".join(map(re.escape, replacements.keys())))
-        return regex.sub(lambda match: replacements[match.string[match.start():match.end()]](match.string[match.start():match.end()]), text)
+    @classmethod
+    def compile_template(cls, text, additional_replacements = {}):
+        ''' :return: a TextTemplate of text resolving placeholders with this utils class '''
+        return TextTemplate(text, cls, additional_replacements)
+
+    @classmethod
+    def compile_text(cls, text, additional_replacements = {}):
+        return cls.compile_template(text, additional_replacements).render()
 
     @staticmethod
     def does_text_width_fit(display, text, font):
-        left, top, right, bottom = display.draw.textbbox((0, 0), text, font=font)
+        left, top, right, bottom = Utils.text_metrics.textbbox(display, text, font)
         return display.width > right - left
 
     @staticmethod
@@ -69,21 +291,39 @@ class Utils:
         return slug
         
 class HassioUtils(Utils):
+    client = None
+
+    @staticmethod
+    def supervisor():
+        ''' :return: the shared Supervisor API client '''
+        if HassioUtils.client is None:
+            HassioUtils.client = SupervisorClient()
+        return HassioUtils.client
+
     @staticmethod
     def hassos_get_info(type):
-        url = 'http://supervisor/{}'.format(type)
-        Utils.logger.info("Requesting data from '" + url + "'")
-        cmd = 'curl -sSL -H "Authorization: Bearer $SUPERVISOR_TOKEN" -H "Content-Type: application/json" ' + url
-        info = Utils.shell_cmd(cmd)
-        return json.loads(info)
+        return HassioUtils.supervisor().get(type)
+
+    @staticmethod
+    def hassos_get_infos(types):
+        ''' fetch several Supervisor endpoints concurrently, :return: dict of type to response '''
+        return HassioUtils.supervisor().get_many(types)
 
     @staticmethod
     def get_hostname(opt = ""):
+        return Utils.cached_identity(('hassio', 'hostname'), HassioUtils.lookup_hostname)
+
+    @staticmethod
+    def lookup_hostname():
         host_info = HassioUtils.hassos_get_info('host/info')
         return host_info['data']['hostname'].upper()
 
     @staticmethod
     def get_ip():
+        return Utils.cached_identity(('hassio', 'ip'), HassioUtils.lookup_ip)
+
+    @staticmethod
+    def lookup_ip():
         network_info = HassioUtils.hassos_get_info('network/info')
         first_interface_with_ipv4 = next((interface for interface in network_info["data"]["interfaces"] if interface["ipv4"]["address"]), None)
         if first_interface_with_ipv4:
@@ -91,16 +331,6 @@ class HassioUtils(Utils):
         else:
             return "0.0.0.0"
 
-    @staticmethod
-    def compile_text(text, additional_replacements = {}):
-        replacements = {
-            "{hostname}": lambda prop: HassioUtils.get_hostname(),
-            "{ip}": lambda prop: HassioUtils.get_ip()
-        }
-        text = Utils.compile_text(text, {**replacements, **additional_replacements})
-        regex = re.compile("{hassio\.[a-z]+\.[a-z\.]+}")
-        return regex.sub(lambda match: HassioUtils.get_hassio_info_property(match.string[match.start():match.end()][len("hassio\."):-1]), text)
-
     @staticmethod
     def get_hassio_info_property(properties_string):
         '''
@@ -129,6 +129,13 @@ class SMBus:
         called to open the bus.
         """
         self._device = None
+        # Address last set with I2C_SLAVE, None when unknown.
+        self._selected = None
+        # Number of slave selects requested, and how many skipped the ioctl.
+        self.select_requests = 0
+        self.select_skipped = 0
+        # Reusable staging buffer for write_i2c_block_buffer.
+        self._transfer = memoryview(bytearray(0))
         if bus is not None:
             self.open(bus)
 
@@ -157,6 +164,7 @@ class SMBus:
         # or else Python 3 fails (see: https://bugs.python.org/issue20074)
         # pylint: disable=consider-using-with
         self._device = open(f"/dev/i2c-{bus}", "r+b", buffering=0)
+        self._selected = None
         # pylint: enable=consider-using-with
         # TODO: Catch IOError and throw a better error message that describes
         # what's wrong (i.e. I2C may not be enabled or the bus doesn't exist).
@@ -167,10 +175,20 @@ class SMBus:
         if self._device is not None:
             self._device.close()
             self._device = None
+        self._selected = None
 
     def _select_device(self, addr):
-        """Set the address of the device to communicate with on the I2C bus."""
-        ioctl(self._device.fileno(), I2C_SLAVE, addr & 0x7F)
+        """Set the address of the device to communicate with on the I2C bus.
+        The address sticks to the open file, so the ioctl is skipped when it
+        has not changed since the last call.
+        """
+        addr &= 0x7F
+        self.select_requests += 1
+        if addr == self._selected:
+            self.select_skipped += 1
+            return
+        ioctl(self._device.fileno(), I2C_SLAVE, addr)
+        self._selected = addr
 
     def read_byte(self, addr):
         """Read a single byte from the specified device."""
@@ -375,6 +393,24 @@ class SMBus:
         self._select_device(addr)
         self._device.write(data)
 
+    def write_i2c_block_buffer(self, addr, cmd, buf):
+        """Write a buffer of data to the specified cmd register of the device.
+        buf can be any object supporting the buffer protocol (bytes, bytearray,
+        memoryview).  The register and data are staged in a buffer owned by
+        this instance, so repeated writes of similar size do not allocate.
+        """
+        assert (
+            self._device is not None
+        ), "Bus must be opened before operations are made against it!"
+        length = len(buf) + 1
+        if len(self._transfer) < length:
+            self._transfer = memoryview(bytearray(length))
+        self._transfer[0] = cmd & 0xFF
+        self._transfer[1:length] = buf
+        # Send the data to the device.
+        self._select_device(addr)
+        self._device.write(self._transfer[:length])
+
     def process_call(self, addr, cmd, val):
         """Perform a smbus process call by writing a word (2 byte) value to
         the specified register of the device, and then reading a word of response
@@ -1,14 +1,22 @@
 #!/usr/bin/python3
 
+import time
+
+# taken before the imports below, so the startup report includes them
+STARTED = time.monotonic()
+
 import logging
 import getopt
 import os
 import sys
 
+from bin.AsyncEngine import AsyncEngine
 from bin.Config import Config
 from bin.Screens import Display
 from bin.Utils import Utils
 
+IMPORTED = time.monotonic()
+
 LOG_LEVEL = logging.WARNING
 
 def print_help():
@@ -43,17 +51,48 @@ def start(config, logger):
 
     config.enable_graceful_exit()
 
+    if config.get_option_value('async_engine'):
+        logger.info('Using the asyncio engine')
+        AsyncEngine(config).run()
+        return
+
+    scheduler = config.get_scheduler()
+    prefetcher = config.get_prefetcher()
+
     while config.allow_master_render:
-        for name in screens:
-            if config.allow_screen_render(name):
-                logger.info("'" + name + "' is being processed")
-                try:
-                    screen = config.screen_factory(name)
-                    screen.run()
-                    config.reduce_screen_limit(name)
-                except Exception as e:
-                    logger.critical("Screen '" + name + "' has an internal error: " + str(e))
-                    continue
+        name = scheduler.next()
+        if name is None:
+            break
+
+        logger.info("'" + name + "' is being processed")
+        try:
+            prefetched = prefetcher.take(name) if prefetcher else False
+            # the exit may have been requested while waiting on the prefetch
+            if not config.allow_master_render:
+                break
+            screen = config.get_screen(name)
+
+            # gather the next screen's data while this one is on display
+            upcoming = scheduler.peek()
+            if prefetcher and upcoming and upcoming != name:
+                prefetcher.prefetch(upcoming)
+
+            screen.run(prefetched)
+            config.reduce_screen_limit(name)
+            if prefetcher:
+                logger.info(prefetcher.report())
+        except Exception as e:
+            logger.critical("Screen '" + name + "' has an internal error: " + str(e))
+        finally:
+            scheduler.done(name)
+
+    if prefetcher:
+        prefetcher.close()
+
+def startup_report(configured):
+    now = time.monotonic()
+    return (f'Startup: imports {IMPORTED - STARTED:.3f}s, config {configured - IMPORTED:.3f}s, '
+            f'first frame {now - configured:.3f}s, {now - STARTED:.3f}s in total')
 
 def set_logging_level(level):
     logging.basicConfig()
@@ -104,4 +143,6 @@ if __name__ == "__main__":
         logger.critical("No options.json file available.")
         sys.exit(2)
 
+    configured = time.monotonic()
+    config.on_first_frame = lambda: logger.info(startup_report(configured))
     start(config, logger)
@@ -0,0 +1,115 @@
+'''
+    Checks and times SSD1306Base.image() without a display attached.
+
+    Random 1 bit images at 128x32 and 128x64 are converted with the original
+    per-pixel loop, the lookup table path and, when numpy is installed, the
+    numpy path. Every path must produce the same buffer, also when only some
+    pages are converted, before the conversion rates are printed.
+
+    Run from the repository root:
+        python3 -m tools.image_benchmark [seconds per measurement]
+'''
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from bin import SSD1306
+
+SIZES = [(128, 32), (128, 64)]
+
+
+class OffscreenBuffer(SSD1306.SSD1306Base):
+    ''' the driver's display buffer, on a bus which is never opened '''
+    def __init__(self, width, height):
+        # without a bus number SMBus opens no device, and image() never writes to it
+        super().__init__(width, height, busnum=None)
+
+    def image_per_pixel(self, image):
+        ''' the conversion loop image() used before it packed whole rows '''
+        pix = image.load()
+        index = 0
+        for page in range(self._pages):
+            for x in range(self.width):
+                bits = 0
+                for bit in [0, 1, 2, 3, 4, 5, 6, 7]:
+                    bits = bits << 1
+                    bits |= 0 if pix[(x, page*8+7-bit)] == 0 else 1
+                self._buffer[index] = bits
+                index += 1
+
+
+def sample_images(width, height, count = 20):
+    images = [Image.new('1', (width, height), 0), Image.new('1', (width, height), 1)]
+    for _ in range(count):
+        images.append(Image.frombytes('1', (width, height), os.urandom(width*height//8)))
+
+    text = Image.new('1', (width, height))
+    ImageDraw.Draw(text).text((3, 2), 'TEMP: 45.1 °C', fill=255)
+    images.append(text)
+    return images
+
+
+def converters():
+    paths = {
+        'per-pixel': lambda buffer, image: buffer.image_per_pixel(image),
+        'lookup': lambda buffer, image: buffer._image_lut(image, 0, buffer._pages-1)
+    }
+    if SSD1306.numpy is not None:
+        paths['numpy'] = lambda buffer, image: buffer._image_numpy(image, 0, buffer._pages-1)
+    return paths
+
+
+def check(width, height):
+    ''' :return: the names of the paths whose output differs from the per-pixel loop '''
+    failed = set()
+    paths = converters()
+    for image in sample_images(width, height):
+        reference = OffscreenBuffer(width, height)
+        reference.image_per_pixel(image)
+        for name, convert in paths.items():
+            buffer = OffscreenBuffer(width, height)
+            convert(buffer, image)
+            if buffer._buffer != reference._buffer:
+                failed.add(name)
+
+        # converting only the changed pages must leave the others untouched
+        buffer = OffscreenBuffer(width, height)
+        buffer.image(Image.new('1', (width, height)))
+        buffer.image(image, [(0, 8, width, 16)])
+        expected = bytearray(width*(height//8))
+        expected[width:width*2] = reference._buffer[width:width*2]
+        if buffer._buffer != expected:
+            failed.add('regions')
+    return failed
+
+
+def measure(width, height, convert, seconds):
+    buffer = OffscreenBuffer(width, height)
+    images = sample_images(width, height, 8)
+    frames = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        convert(buffer, images[frames % len(images)])
+        frames += 1
+    return frames / (time.perf_counter() - started)
+
+
+def main(seconds):
+    failed = False
+    for width, height in SIZES:
+        wrong = check(width, height)
+        if wrong:
+            failed = True
+            print(f"{width}x{height}: differs from the per-pixel loop: {', '.join(sorted(wrong))}")
+            continue
+
+        rates = [f"{name} {measure(width, height, convert, seconds):.0f} fps"
+                 for name, convert in converters().items()]
+        print(f"{width}x{height}: " + ', '.join(rates))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0))
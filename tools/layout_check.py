@@ -0,0 +1,159 @@
+'''
+    Checks that Layout.render() leaves the canvas as a full redraw would.
+
+    Lines of text are laid out the way screens place them, for each number
+    of lines, font size and indent, then updated with random values. After
+    every render the canvas must match one drawn from scratch with the same
+    values, otherwise a cleared rectangle missed ink and pixels went stale.
+
+    The live CPU, memory and storage screens are checked the same way: each
+    update_text() of random data, growing and shrinking, must match the
+    screen rendered from scratch with that data.
+
+    Run from the repository root:
+        python3 -m tools.layout_check [updates per layout]
+'''
+import random
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bin.Layout import Layout, TextRegion
+from bin.Metrics import CpuInfo
+from bin.Screens import CpuScreen, MemoryScreen, StorageScreen
+from bin.Utils import Utils
+
+FONTS = [Utils.current_dir + "/fonts/DejaVuSans.ttf", Utils.current_dir + "/fonts/DejaVuSans-Bold.ttf"]
+# line positions and font sizes screens use for 1, 2 and 3 lines, without and with an indent
+LINES = {1: ([0], 14, 13), 2: ([0, 18], 14, 13), 3: ([0, 11, 21], 10, 9)}
+INDENTS = [0, 16, 29]
+WORDS = ['WWW', 'gjqy', 'WAVE', 'vm', '°C', 'USED: 1.2 GB', '3 DAYS', 'CPU: 7%',
+         'TEMP: 45.1 °C', 'HOST: homeassistant', 'IP: 192.168.1.20', 'MEM: 512 MB', 'Ty',
+         'fj', '/', '|', '1', '']
+# the display options screens are checked with
+DISPLAYS = [{'show_icons': True}, {'show_hint': True}, {'show_hint': True, 'hint_right': False}, {},
+            {'show_icons': True, 'compact': True}, {'show_hint': True, 'hint_right': False, 'compact': True}]
+
+
+class Canvas:
+    ''' the Display's canvas without a panel behind it '''
+    def __init__(self, width = 128, height = 32, show_icons = False, show_hint = False,
+                 hint_right = True, compact = False):
+        self.width = width
+        self.height = height
+        self.show_icons = show_icons
+        self.show_hint = show_hint
+        self.hint_right = hint_right
+        self.compact = compact
+        self.flusher = None
+        self.image = Image.new('1', (width, height))
+        self.draw = ImageDraw.Draw(self.image)
+
+    def prepare(self):
+        self.draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
+
+    def show(self, regions = None):
+        pass
+
+    def capture_screenshot(self, name):
+        pass
+
+
+def random_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 3)))
+
+
+def create_layout(canvas, font, indent, ys):
+    layout = Layout(canvas)
+    for line, y in enumerate(ys):
+        layout.add(TextRegion('line' + str(line), (indent, y), font))
+    return layout
+
+
+def check(font, indent, ys, updates, rng):
+    ''' :return: the number of renders which left the canvas differing from a full redraw '''
+    canvas = Canvas()
+    layout = create_layout(canvas, font, indent, ys)
+    failed = 0
+    for _ in range(updates):
+        values = [random_text(rng) for _ in ys]
+        for line, value in enumerate(values):
+            layout.update('line' + str(line), value)
+        layout.render()
+
+        expected = Canvas()
+        reference = create_layout(expected, font, indent, ys)
+        for line, value in enumerate(values):
+            reference.update('line' + str(line), value)
+        reference.render()
+        if canvas.image.tobytes() != expected.image.tobytes():
+            failed += 1
+    return failed
+
+
+def random_data(screen, rng):
+    ''' values ranging from a single digit to as wide as the screen shows them '''
+    scale = 10 ** rng.randint(0, 3)
+    if isinstance(screen, CpuScreen):
+        return CpuInfo([rng.random() * scale for _ in range(3)],
+                       rng.random() * 86400 * scale, rng.uniform(-9, 99))
+    if isinstance(screen, MemoryScreen):
+        total = rng.randint(1, 64) * 1000
+        return (rng.randint(0, total), total)
+    total = rng.randint(1, 2000) * 1024 * 1024
+    used = rng.randint(0, total)
+    return (used, total, f"{used * 100 // total}%")
+
+
+def check_screen(kind, options, updates, rng):
+    ''' :return: the number of live updates which left the canvas differing from a full render '''
+    canvas = Canvas(**options)
+    screen = kind(0, canvas)
+    screen.data = random_data(screen, rng)
+    # a full render sets the hint and icon, as the first frame of render_live() does
+    screen.render()
+
+    failed = 0
+    for _ in range(updates):
+        data = random_data(screen, rng)
+        screen.update_text(screen.format_lines(data))
+
+        expected = Canvas(**options)
+        reference = kind(0, expected)
+        reference.data = data
+        reference.render()
+        if canvas.image.tobytes() != expected.image.tobytes():
+            failed += 1
+    return failed
+
+
+def main(updates):
+    rng = random.Random(0)
+    failed = False
+    for path in FONTS:
+        for lines, (ys, plain_size, indented_size) in LINES.items():
+            for indent in INDENTS:
+                size = indented_size if indent >= 10 else plain_size
+                font = ImageFont.truetype(path, size)
+                stale = check(font, indent, ys, updates, rng)
+                if stale:
+                    failed = True
+                    name = path.rsplit('/', 1)[-1]
+                    print(f"{name} {size}px, {lines} lines at x={indent}: "
+                          f"{stale} of {updates} renders differ from a full redraw")
+
+    for kind in [CpuScreen, MemoryScreen, StorageScreen]:
+        for options in DISPLAYS:
+            stale = check_screen(kind, options, updates, rng)
+            if stale:
+                failed = True
+                print(f"{kind.__name__} with {options}: "
+                      f"{stale} of {updates} live updates differ from a full render")
+
+    if not failed:
+        print(f"all renders match a full redraw, {updates} updates per layout")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))